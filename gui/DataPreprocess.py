@@ -4,6 +4,7 @@ import pandas as pd
 from sklearn.preprocessing import MinMaxScaler, OneHotEncoder
 from sklearn.decomposition import PCA  # 导入 PCA 模块
 import threading
+from Profiler import StageProfiler
 
 
 class DataPreprocessingPage(wx.Panel):
@@ -11,6 +12,8 @@ class DataPreprocessingPage(wx.Panel):
         super(DataPreprocessingPage, self).__init__(parent)
         self.data = None
         self.grid = None  # 延迟创建网格
+        self.profiler = StageProfiler("数据预处理",
+                                      on_report=lambda report: wx.CallAfter(self.ShowDiagnostics, report))
         self.InitUI()
 
     def InitUI(self):
@@ -71,12 +74,21 @@ class DataPreprocessingPage(wx.Panel):
         btn_save.Bind(wx.EVT_BUTTON, self.OnSaveFile)
         hbox_controls.Add(btn_save, 0, wx.ALL, 5)
 
+        # 深度剖析开关（cProfile/tracemalloc）
+        self.profile_checkbox = wx.CheckBox(self, label="深度剖析")
+        self.profile_checkbox.Bind(wx.EVT_CHECKBOX, self.OnToggleProfiling)
+        hbox_controls.Add(self.profile_checkbox, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+
         self.vbox.Add(hbox_controls, 0, wx.EXPAND | wx.ALL, 5)
 
         # 创建一个占位符，稍后会在数据加载后替换为实际的网格
         self.placeholder = wx.StaticText(self, label="打开流量文件后数据将会显示于此")
         self.vbox.Add(self.placeholder, 1, wx.EXPAND | wx.ALL, 5)
 
+        # 性能诊断面板
+        self.diag_output = wx.TextCtrl(self, size=(-1, 120), style=wx.TE_MULTILINE | wx.TE_READONLY)
+        self.vbox.Add(self.diag_output, 0, wx.EXPAND | wx.ALL, 5)
+
         self.SetSizer(self.vbox)
 
     def OnOpenFile(self, event):
@@ -92,7 +104,9 @@ class DataPreprocessingPage(wx.Panel):
     def LoadData(self, pathname):
         """加载数据并更新表格"""
         try:
-            self.data = pd.read_excel(pathname)
+            with self.profiler.operation("加载数据"):
+                with self.profiler.stage("文件解析"):
+                    self.data = pd.read_excel(pathname)
             wx.CallAfter(self.UpdateGrid)
         except Exception as e:
             wx.MessageBox(f"读取文件失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
@@ -102,38 +116,43 @@ class DataPreprocessingPage(wx.Panel):
         if self.data is None or self.data.empty:
             return
 
-        # 如果还没有创建网格，则创建一个新的网格
-        if self.grid is None:
-            self.grid = gridlib.Grid(self)
-            self.grid.CreateGrid(0, 0)
-            self.vbox.Replace(self.placeholder, self.grid)
-            self.placeholder.Destroy()
-            self.placeholder = None
-            self.Layout()  # 刷新布局
-
-        # 更新列数并设置表头
-        cols = len(self.data.columns)
-        current_cols = self.grid.GetNumberCols()
-        if current_cols != cols:
-            if current_cols > 0:
-                self.grid.DeleteCols(0, current_cols)
-            self.grid.AppendCols(cols)
-        for col, header in enumerate(self.data.columns):
-            self.grid.SetColLabelValue(col, str(header))
-
-        # 更新行数并填充数据
-        rows = len(self.data)
-        current_rows = self.grid.GetNumberRows()
-        if current_rows < rows:
-            self.grid.AppendRows(rows - current_rows)
-        elif current_rows > rows:
-            self.grid.DeleteRows(rows, current_rows - rows)
-
-        for row_idx, (_, values) in enumerate(self.data.iterrows()):
-            for col_idx, value in enumerate(values):
-                self.grid.SetCellValue(row_idx, col_idx, str(value))
-
-        self.Layout()  # 刷新布局
+        with self.profiler.operation("表格刷新"):
+            with self.profiler.stage("网格结构调整"):
+                # 如果还没有创建网格，则创建一个新的网格
+                if self.grid is None:
+                    self.grid = gridlib.Grid(self)
+                    self.grid.CreateGrid(0, 0)
+                    self.vbox.Replace(self.placeholder, self.grid)
+                    self.placeholder.Destroy()
+                    self.placeholder = None
+                    self.Layout()  # 刷新布局
+
+                # 更新列数并设置表头
+                cols = len(self.data.columns)
+                current_cols = self.grid.GetNumberCols()
+                if current_cols != cols:
+                    if current_cols > 0:
+                        self.grid.DeleteCols(0, current_cols)
+                    self.grid.AppendCols(cols)
+                for col, header in enumerate(self.data.columns):
+                    self.grid.SetColLabelValue(col, str(header))
+
+                # 更新行数
+                rows = len(self.data)
+                current_rows = self.grid.GetNumberRows()
+                if current_rows < rows:
+                    self.grid.AppendRows(rows - current_rows)
+                elif current_rows > rows:
+                    self.grid.DeleteRows(rows, current_rows - rows)
+
+            # 填充数据
+            with self.profiler.stage("单元格填充"):
+                for row_idx, (_, values) in enumerate(self.data.iterrows()):
+                    for col_idx, value in enumerate(values):
+                        self.grid.SetCellValue(row_idx, col_idx, str(value))
+
+            with self.profiler.stage("布局刷新"):
+                self.Layout()  # 刷新布局
 
     def GetSelectedIndices(self):
         """从输入框中获取用户选择的行或列索引"""
@@ -159,8 +178,10 @@ class DataPreprocessingPage(wx.Panel):
             return
 
         try:
-            self.data.drop(self.data.columns[selected_columns], axis=1, inplace=True)
-            self.UpdateGrid()
+            with self.profiler.operation("删除列"):
+                with self.profiler.stage("删除列"):
+                    self.data.drop(self.data.columns[selected_columns], axis=1, inplace=True)
+                self.UpdateGrid()
         except Exception as e:
             wx.MessageBox(f"删除失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
 
@@ -179,8 +200,10 @@ class DataPreprocessingPage(wx.Panel):
                 wx.MessageBox("输入的行索引超出范围！", "错误", wx.OK | wx.ICON_ERROR)
                 return
 
-            self.data.drop(selected_rows, inplace=True)
-            self.UpdateGrid()
+            with self.profiler.operation("删除行"):
+                with self.profiler.stage("删除行"):
+                    self.data.drop(selected_rows, inplace=True)
+                self.UpdateGrid()
         except Exception as e:
             wx.MessageBox(f"删除行失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
 
@@ -194,17 +217,19 @@ class DataPreprocessingPage(wx.Panel):
             return
 
         try:
-            scaler = MinMaxScaler()
-            normalized_data = scaler.fit_transform(self.data.iloc[:, selected_columns])
+            with self.profiler.operation("归一化"):
+                with self.profiler.stage("归一化计算"):
+                    scaler = MinMaxScaler()
+                    normalized_data = scaler.fit_transform(self.data.iloc[:, selected_columns])
 
-            # 将归一化后的数据转换为 DataFrame 并设置正确的列名
-            normalized_df = pd.DataFrame(normalized_data, columns=self.data.columns[selected_columns])
+                    # 将归一化后的数据转换为 DataFrame 并设置正确的列名
+                    normalized_df = pd.DataFrame(normalized_data, columns=self.data.columns[selected_columns])
 
-            # 更新原始数据框中的对应列
-            self.data.update(normalized_df)
+                    # 更新原始数据框中的对应列
+                    self.data.update(normalized_df)
 
-            # 强制更新网格显示
-            self.UpdateGrid()
+                # 强制更新网格显示
+                self.UpdateGrid()
         except Exception as e:
             wx.MessageBox(f"归一化失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
 
@@ -218,11 +243,14 @@ class DataPreprocessingPage(wx.Panel):
             return
 
         try:
-            encoder = OneHotEncoder()
-            encoded_data = encoder.fit_transform(self.data.iloc[:, selected_columns])
-            encoded_df = pd.DataFrame(encoded_data.toarray(), columns=encoder.get_feature_names_out())
-            self.data = pd.concat([self.data.drop(self.data.columns[selected_columns], axis=1), encoded_df], axis=1)
-            self.UpdateGrid()
+            with self.profiler.operation("独热编码"):
+                with self.profiler.stage("编码计算"):
+                    encoder = OneHotEncoder()
+                    encoded_data = encoder.fit_transform(self.data.iloc[:, selected_columns])
+                    encoded_df = pd.DataFrame(encoded_data.toarray(), columns=encoder.get_feature_names_out())
+                    self.data = pd.concat([self.data.drop(self.data.columns[selected_columns], axis=1), encoded_df],
+                                          axis=1)
+                self.UpdateGrid()
         except Exception as e:
             wx.MessageBox(f"独热编码失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
 
@@ -232,21 +260,23 @@ class DataPreprocessingPage(wx.Panel):
             return
 
         try:
-            # 删除包含空值的行
-            self.data.dropna(inplace=True)
-
-            # 将数据转换为数值格式（除第一行外）
-            for col in self.data.columns:
-                try:
-                    # 尝试将列转换为数值类型
-                    self.data[col] = pd.to_numeric(self.data[col], errors='coerce')
-                except Exception as e:
-                    wx.MessageBox(f"列 '{col}' 转换失败: {str(e)}", "警告", wx.OK | wx.ICON_WARNING)
-
-            # 删除无法转换为数值的行
-            self.data.dropna(inplace=True)
-
-            self.UpdateGrid()
+            with self.profiler.operation("去除脏数据"):
+                with self.profiler.stage("数据清洗"):
+                    # 删除包含空值的行
+                    self.data.dropna(inplace=True)
+
+                    # 将数据转换为数值格式（除第一行外）
+                    for col in self.data.columns:
+                        try:
+                            # 尝试将列转换为数值类型
+                            self.data[col] = pd.to_numeric(self.data[col], errors='coerce')
+                        except Exception as e:
+                            wx.MessageBox(f"列 '{col}' 转换失败: {str(e)}", "警告", wx.OK | wx.ICON_WARNING)
+
+                    # 删除无法转换为数值的行
+                    self.data.dropna(inplace=True)
+
+                self.UpdateGrid()
         except Exception as e:
             wx.MessageBox(f"去除脏数据失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
 
@@ -269,18 +299,20 @@ class DataPreprocessingPage(wx.Panel):
             if num_components == -1:  # 用户点击了取消
                 return
 
-            # 执行 PCA 降维
-            pca = PCA(n_components=num_components)
-            pca_result = pca.fit_transform(self.data.iloc[:, selected_columns])
+            with self.profiler.operation("PCA 降维"):
+                # 执行 PCA 降维
+                with self.profiler.stage("PCA 计算"):
+                    pca = PCA(n_components=num_components)
+                    pca_result = pca.fit_transform(self.data.iloc[:, selected_columns])
 
-            # 将降维结果转换为 DataFrame
-            pca_df = pd.DataFrame(pca_result, columns=[f"PC{i+1}" for i in range(num_components)])
+                    # 将降维结果转换为 DataFrame
+                    pca_df = pd.DataFrame(pca_result, columns=[f"PC{i+1}" for i in range(num_components)])
 
-            # 删除原始列并添加 PCA 结果列
-            self.data = pd.concat([self.data.drop(self.data.columns[selected_columns], axis=1), pca_df], axis=1)
+                    # 删除原始列并添加 PCA 结果列
+                    self.data = pd.concat([self.data.drop(self.data.columns[selected_columns], axis=1), pca_df], axis=1)
 
-            # 更新网格显示
-            self.UpdateGrid()
+                # 更新网格显示
+                self.UpdateGrid()
         except Exception as e:
             wx.MessageBox(f"PCA 降维失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
 
@@ -301,11 +333,21 @@ class DataPreprocessingPage(wx.Panel):
     def SaveData(self, pathname):
         """保存数据到指定路径"""
         try:
-            self.data.to_excel(pathname, index=False)
+            with self.profiler.operation("保存文件"):
+                with self.profiler.stage("写入文件"):
+                    self.data.to_excel(pathname, index=False)
             wx.MessageBox("文件保存成功！", "成功", wx.OK | wx.ICON_INFORMATION)
         except Exception as e:
             wx.MessageBox(f"保存文件失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
 
+    def OnToggleProfiling(self, event):
+        """切换 cProfile/tracemalloc 深度剖析"""
+        self.profiler.capture = event.IsChecked()
+
+    def ShowDiagnostics(self, report):
+        """在诊断面板显示最近几次操作的性能报告（最新的在前）"""
+        self.diag_output.SetValue(self.profiler.history_text())
+
     def ShowProgressDialog(self, message, task, *args):
 
         progress_dialog = wx.ProgressDialog("请稍候", message, maximum=100, parent=self,
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def _user_cache_dir():
+    """当前用户私有的平台缓存目录"""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser(os.path.join('~', 'AppData', 'Local'))
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'mlmet', 'features')
+
+
+# 缓存目录，可通过环境变量指定到本地磁盘；必须只有当前用户可写，否则他人可植入特征矩阵
+CACHE_DIR = os.environ.get('MLMET_CACHE_DIR', _user_cache_dir())
+
+# 缓存总大小上限（字节），超出后按最近使用时间淘汰旧矩阵
+MAX_CACHE_BYTES = int(os.environ.get('MLMET_CACHE_MAX_BYTES', 4 * 1024 ** 3))
+
+# 物化时每次转换的行数，避免一次性生成整表副本
+CHUNK_ROWS = 65536
+
+# 崩溃遗留的临时文件超过该时长（秒）后在淘汰时清理
+STALE_TMP_SECONDS = 24 * 3600
+
+
+def source_key(*paths):
+    """由数据文件的路径、大小和修改时间生成数据集标识，文件变化后标识随之变化"""
+    parts = []
+    for path in paths:
+        stat = os.stat(path)
+        parts.append(f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}")
+    return "\n".join(parts)
+
+
+def is_numeric_frame(frame, columns):
+    """各特征列均为数值类型时才能物化为 float32 矩阵；含字符串/类别列时由模型自行编码"""
+    return all(pd.api.types.is_numeric_dtype(frame[col]) for col in columns)
+
+
+def iter_chunks(features, columns, chunk_rows=CHUNK_ROWS):
+    """按块产出 (起始行, 结束行, 带列名的 DataFrame)；features 为物化矩阵或原始数据表
+
+    以带列名的 DataFrame 传给模型，按列名选取特征的流水线（如 ColumnTransformer）才能正常工作。
+    """
+    for start in range(0, len(features), chunk_rows):
+        end = min(start + chunk_rows, len(features))
+        if isinstance(features, pd.DataFrame):
+            yield start, end, features.iloc[start:end][columns]
+        else:
+            yield start, end, pd.DataFrame(features[start:end], columns=columns, copy=False)
+
+
+def open_matrix(path, shape):
+    """只读打开已物化的特征矩阵，供多个工作进程共享同一份页缓存"""
+    if 0 in shape:
+        # 空文件无法建立内存映射
+        return np.empty(tuple(shape), dtype=np.float32)
+    return np.memmap(path, dtype=np.float32, mode='r', shape=tuple(shape))
+
+
+class FeatureStore:
+    """按 (数据集, 特征列表) 缓存对齐后的 float32 特征矩阵（C 连续、内存映射）"""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._opened = {}
+        self._checked = False
+
+    def _paths(self, dataset_key, columns):
+        digest = hashlib.sha1(json.dumps([dataset_key, list(map(str, columns))]).encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, digest)
+        return base + '.f32', base + '.json'
+
+    def _check_dir(self):
+        """创建私有缓存目录（0o700），并拒绝使用其他用户的目录"""
+        if self._checked:
+            return
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+        if hasattr(os, 'getuid'):
+            stat = os.stat(self.cache_dir)
+            if stat.st_uid != os.getuid():
+                raise PermissionError(f"缓存目录 {self.cache_dir} 不属于当前用户")
+            if stat.st_mode & 0o077:
+                os.chmod(self.cache_dir, 0o700)
+        self._checked = True
+
+    def get(self, dataset_key, frame, columns):
+        """返回按 columns 顺序排列的特征矩阵，已物化时直接映射，不再复制数据"""
+        columns = list(columns)
+        data_path, meta_path = self._paths(dataset_key, columns)
+        if data_path in self._opened:
+            return self._opened[data_path]
+
+        self._check_dir()
+        matrix = None
+        if os.path.exists(meta_path) and os.path.exists(data_path):
+            matrix = self._open_entry(data_path, meta_path, columns)
+            if matrix is not None:
+                # 元数据的修改时间记录最近使用时间，供淘汰时排序
+                os.utime(meta_path)
+        if matrix is None:
+            meta = self._materialize(frame, columns, data_path, meta_path)
+            self._evict(keep=data_path)
+            matrix = open_matrix(data_path, meta['shape'])
+
+        self._opened[data_path] = matrix
+        return matrix
+
+    def _open_entry(self, data_path, meta_path, columns):
+        """打开已物化的矩阵；元数据损坏或数据文件被截断时删除该条目并返回 None 以便重建"""
+        try:
+            with open(meta_path, encoding='utf-8') as fh:
+                meta = json.load(fh)
+            rows, cols = meta['shape']
+            if meta['columns'] != [str(col) for col in columns] or os.path.getsize(data_path) != rows * cols * 4:
+                raise ValueError("缓存条目与元数据不符")
+            return open_matrix(data_path, (rows, cols))
+        except (OSError, ValueError, KeyError, TypeError):
+            for path in (meta_path, data_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            return None
+
+    def _materialize(self, frame, columns, data_path, meta_path):
+        shape = (len(frame), len(columns))
+        tmp_path = f"{data_path}.{os.getpid()}.tmp"
+        meta_tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+        meta = {'shape': shape, 'columns': [str(col) for col in columns]}
+
+        try:
+            if shape[0] and shape[1]:
+                matrix = np.memmap(tmp_path, dtype=np.float32, mode='w+', shape=shape)
+                try:
+                    for start in range(0, shape[0], CHUNK_ROWS):
+                        end = min(start + CHUNK_ROWS, shape[0])
+                        matrix[start:end] = frame.iloc[start:end][columns].to_numpy(dtype=np.float32)
+                    matrix.flush()
+                finally:
+                    del matrix
+            else:
+                open(tmp_path, 'wb').close()
+            with open(meta_tmp_path, 'w', encoding='utf-8') as fh:
+                json.dump(meta, fh, ensure_ascii=False)
+
+            # 先写数据再写元数据，元数据存在即表示物化完成；重命名保证并发进程看到完整文件
+            os.replace(tmp_path, data_path)
+            os.replace(meta_tmp_path, meta_path)
+        except BaseException:
+            # 转换失败（如列中含无法转为数值的字符串）时不留下临时文件
+            for path in (tmp_path, meta_tmp_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            raise
+        return meta
+
+    def _evict(self, keep):
+        """缓存超出上限时删除最久未使用的矩阵；当前矩阵和本进程已映射的矩阵不删除"""
+        entries = []
+        total = 0
+        now = time.time()
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith('.tmp'):
+                # 进程崩溃遗留的临时文件；近期的可能仍在写入
+                try:
+                    if now - os.path.getmtime(path) > STALE_TMP_SECONDS:
+                        os.remove(path)
+                except OSError:
+                    pass
+                continue
+            if not name.endswith('.json'):
+                continue
+            meta_path = path
+            data_path = meta_path[:-len('.json')] + '.f32'
+            try:
+                used = os.path.getmtime(meta_path)
+                size = os.path.getsize(data_path)
+            except OSError:
+                continue  # 其他进程正在写入或刚删除
+            entries.append((used, data_path, meta_path, size))
+            total += size
+
+        for used, data_path, meta_path, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if data_path == keep or data_path in self._opened:
+                continue
+            try:
+                # 先删元数据，其他进程不会再把它当作已物化
+                os.remove(meta_path)
+                os.remove(data_path)
+            except OSError:
+                continue  # Windows 下其他进程仍在映射时无法删除，留待下次
+            total -= size
+
+    def release(self):
+        """释放当前进程持有的映射（切换数据集时调用）"""
+        self._opened.clear()
@@ -0,0 +1,539 @@
+import json
+import logging
+import multiprocessing
+import os
+import re
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('mlmet.flow')
+
+# 单进程吞吐目标（包/秒），低于该值时记录警告
+TARGET_PPS = 500000
+
+# 包数少于该值时启动开销占主导，不做吞吐检查
+MIN_PPS_PACKETS = 100000
+
+# 每次读取的文件块大小，决定包缓冲区的内存上限
+BLOCK_SIZE = 16 * 1024 * 1024
+
+# 流超时（秒）：与 CICFlowMeter 一致，包时间距流首包超过该时长时结束当前流并以该包开始新流
+FLOW_TIMEOUT = 120.0
+
+# pcap 魔数 -> 时间戳小数部分的换算系数
+PCAP_MAGIC = {
+    0xa1b2c3d4: 1e-6,
+    0xa1b23c4d: 1e-9,
+}
+
+# 链路类型 -> 链路层头部长度
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINK_HEADER_LEN = {
+    LINKTYPE_ETHERNET: 14,
+    LINKTYPE_RAW: 0,
+    LINKTYPE_LINUX_SLL: 16,
+}
+
+# TCP 标志位
+TCP_FLAGS = {
+    'FIN': 0x01,
+    'SYN': 0x02,
+    'RST': 0x04,
+    'PSH': 0x08,
+    'ACK': 0x10,
+    'URG': 0x20,
+}
+
+# 输出特征列：CICFlowMeter 约 78 项特征中的 25 项，命名与计算口径与之一致
+# （包长度为传输层载荷字节数，标准差为样本标准差，流在超时或 FIN 时结束），
+# 完整 CIC 特征集训练的模型无法直接对 pcap 评分
+FEATURE_COLUMNS = [
+    'Destination Port', 'Protocol', 'Flow Duration',
+    'Total Fwd Packets', 'Total Backward Packets',
+    'Total Length of Fwd Packets', 'Total Length of Bwd Packets',
+    'Fwd Packet Length Max', 'Fwd Packet Length Min', 'Fwd Packet Length Mean',
+    'Bwd Packet Length Max', 'Bwd Packet Length Min', 'Bwd Packet Length Mean',
+    'Flow Bytes/s', 'Flow Packets/s',
+    'Flow IAT Mean', 'Flow IAT Std', 'Flow IAT Max', 'Flow IAT Min',
+    'FIN Flag Count', 'SYN Flag Count', 'RST Flag Count',
+    'PSH Flag Count', 'ACK Flag Count', 'URG Flag Count',
+]
+
+# 流累加器列及跨批次合并方式
+STATE_AGG = {
+    'first_ts': 'min',
+    'last_ts': 'max',
+    'fwd_pkts': 'sum',
+    'bwd_pkts': 'sum',
+    'fwd_bytes': 'sum',
+    'bwd_bytes': 'sum',
+    'fwd_len_max': 'max',
+    'fwd_len_min': 'min',
+    'bwd_len_max': 'max',
+    'bwd_len_min': 'min',
+    'iat_n': 'sum',
+    'iat_sum': 'sum',
+    'iat_sumsq': 'sum',
+    'iat_max': 'max',
+    'iat_min': 'min',
+    **{f'{name.lower()}_cnt': 'sum' for name in TCP_FLAGS},
+}
+
+# 合并方式对应的初始值与合并函数
+_IDENTITY = {'sum': 0.0, 'min': np.inf, 'max': -np.inf}
+_COMBINE = {'sum': np.add, 'min': np.minimum, 'max': np.maximum}
+
+
+def iter_pcap_blocks(path, block_size=BLOCK_SIZE):
+    """按块流式读取 pcap 文件，每块产出一批解析后的包字段"""
+    with open(path, 'rb') as fh:
+        header = fh.read(24)
+        if len(header) < 24:
+            raise ValueError(f"{path} 不是有效的 pcap 文件")
+
+        magic = struct.unpack('<I', header[:4])[0]
+        if magic in PCAP_MAGIC:
+            endian = '<'
+        else:
+            endian = '>'
+            magic = struct.unpack('>I', header[:4])[0]
+            if magic not in PCAP_MAGIC:
+                raise ValueError(f"{path} 不是 pcap 格式（暂不支持 pcapng）")
+        frac_scale = PCAP_MAGIC[magic]
+        linktype = struct.unpack(endian + 'I', header[20:24])[0] & 0x0fffffff
+        if linktype not in LINK_HEADER_LEN:
+            raise ValueError(f"不支持的链路类型: {linktype}")
+
+        record_len = struct.Struct(endian + 'I').unpack_from
+        header_dtype = np.dtype(endian + 'u4')
+        leftover = b''
+        while True:
+            block = fh.read(block_size)
+            if not block:
+                break
+            data = leftover + block
+            end = len(data)
+
+            # Python 层只读取每条记录的捕获长度来定位记录，其余字段交给 numpy
+            pos = 0
+            records = []
+            while pos + 16 <= end:
+                next_pos = pos + 16 + record_len(data, pos + 8)[0]
+                if next_pos > end:
+                    break
+                records.append(pos)
+                pos = next_pos
+            leftover = data[pos:]
+
+            if records:
+                records = np.asarray(records, dtype=np.int64)
+                buf = np.frombuffer(data, dtype=np.uint8)
+                header = buf[records[:, None] + np.arange(16)].view(header_dtype)
+                ts = header[:, 0].astype(np.float64) + header[:, 1].astype(np.float64) * frac_scale
+                yield _parse_packets(data, records + 16, header[:, 2].astype(np.int64), ts, linktype)
+
+
+def _parse_packets(data, offsets, caplens, ts, linktype):
+    """向量化提取 IPv4 五元组、传输层载荷长度和 TCP 标志，非 IPv4 包被丢弃
+
+    不做分片重组：非首个分片没有端口信息，归入端口为 0 的流。
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    packet_end = offsets + caplens
+    last = len(buf) - 1
+
+    def u8(idx):
+        valid = idx < packet_end
+        return np.where(valid, buf[np.minimum(idx, last)], 0).astype(np.uint32), valid
+
+    def u16(idx):
+        hi, valid = u8(idx)
+        lo, _ = u8(idx + 1)
+        return (hi << 8) | lo, valid & (idx + 1 < packet_end)
+
+    def u32(idx):
+        hi, valid = u16(idx)
+        lo, valid_lo = u16(idx + 2)
+        return (hi << 16) | lo, valid & valid_lo
+
+    ip = offsets + LINK_HEADER_LEN[linktype]
+    if linktype == LINKTYPE_ETHERNET:
+        ethertype, is_ip = u16(offsets + 12)
+        vlan = ethertype == 0x8100
+        ip = ip + 4 * vlan
+        inner, _ = u16(offsets + 16)
+        ethertype = np.where(vlan, inner, ethertype)
+        is_ip &= ethertype == 0x0800
+    elif linktype == LINKTYPE_LINUX_SLL:
+        ethertype, is_ip = u16(offsets + 14)
+        is_ip &= ethertype == 0x0800
+    else:
+        is_ip = np.ones(len(offsets), dtype=bool)
+
+    first, valid = u8(ip)
+    is_ip &= valid & ((first >> 4) == 4)
+    ihl = (first & 0x0f).astype(np.int64) * 4
+    length, _ = u16(ip + 2)
+    frag, _ = u16(ip + 6)
+    proto, _ = u8(ip + 9)
+    src, valid = u32(ip + 12)
+    dst, valid_dst = u32(ip + 16)
+    is_ip &= valid & valid_dst
+
+    # 仅首个分片携带传输层头部
+    l4 = ip + ihl
+    has_ports = ((proto == 6) | (proto == 17)) & ((frag & 0x1fff) == 0)
+    sport, valid = u16(l4)
+    dport, valid_dport = u16(l4 + 2)
+    has_ports &= valid & valid_dport
+    flags, valid = u8(l4 + 13)
+    flags = np.where((proto == 6) & has_ports & valid, flags, 0)
+
+    # 载荷长度 = IP 总长 - IP 头 - 传输层头（TCP 数据偏移×4，UDP 8 字节）
+    data_offset, valid = u8(l4 + 12)
+    tcp_header = np.where(valid, (data_offset >> 4).astype(np.int64) * 4, 20)
+    l4_header = np.where(proto == 6, tcp_header, np.where(proto == 17, 8, 0))
+    l4_header = np.where((frag & 0x1fff) == 0, l4_header, 0)
+    payload = np.maximum(length.astype(np.int64) - ihl - l4_header, 0)
+
+    return {
+        'ts': ts[is_ip],
+        'src': src[is_ip],
+        'dst': dst[is_ip],
+        'sport': np.where(has_ports, sport, 0)[is_ip],
+        'dport': np.where(has_ports, dport, 0)[is_ip],
+        'proto': proto[is_ip],
+        'payload': payload[is_ip],
+        'flags': flags[is_ip],
+        'total': len(offsets),
+    }
+
+
+class FlowTable:
+    """双向流累加表：逐批向量化聚合，按 CICFlowMeter 的规则结束流
+
+    包时间距流首包超过 flow_timeout 时结束当前流，该包开始新流；
+    已有流收到 FIN 包时把该包计入后结束（流的首包带 FIN 不结束）。
+    活动流的累加器按行保存在 numpy 数组中，流键到行号用字典映射；
+    每批只更新本批出现的流，开销与批大小成正比，与活动流总数无关。
+    """
+
+    def __init__(self, flow_timeout=FLOW_TIMEOUT, capacity=4096):
+        self.flow_timeout = flow_timeout
+        self.rows = {}  # (k1, k2) -> 行号
+        self.free = []  # 已回收的行号
+        self.used = 0  # 已分配过的行数
+        self.keys = np.zeros((capacity, 2), dtype=np.uint64)
+        self.a_is_fwd = np.zeros(capacity, dtype=bool)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.acc = {name: np.full(capacity, _IDENTITY[how]) for name, how in STATE_AGG.items()}
+        self.finished = []
+        self.latest_ts = -np.inf
+
+    def _grow(self, min_capacity):
+        capacity = max(min_capacity, 2 * len(self.active))
+        keys = np.zeros((capacity, 2), dtype=np.uint64)
+        keys[:self.used] = self.keys[:self.used]
+        self.keys = keys
+        self.a_is_fwd = np.r_[self.a_is_fwd, np.zeros(capacity - len(self.a_is_fwd), dtype=bool)]
+        self.active = np.r_[self.active, np.zeros(capacity - len(self.active), dtype=bool)]
+        for name, how in STATE_AGG.items():
+            column = self.acc[name]
+            self.acc[name] = np.r_[column, np.full(capacity - len(column), _IDENTITY[how])]
+
+    def _allocate(self, count):
+        """分配 count 个行号，优先复用已输出流的行"""
+        reuse = min(count, len(self.free))
+        reused = self.free[len(self.free) - reuse:]
+        del self.free[len(self.free) - reuse:]
+        fresh = count - reuse
+        if self.used + fresh > len(self.active):
+            self._grow(self.used + fresh)
+        rows = np.r_[np.asarray(reused, dtype=np.int64), np.arange(self.used, self.used + fresh, dtype=np.int64)]
+        self.used += fresh
+        return rows
+
+    def add_batch(self, packets):
+        if len(packets['ts']) == 0:
+            return
+
+        src, dst = packets['src'], packets['dst']
+        sport, dport = packets['sport'], packets['dport']
+        # 端点排序得到与方向无关的流键，a 端为较小的 (ip, port)
+        swap = (src > dst) | ((src == dst) & (sport > dport))
+        from_a = ~swap
+        k1 = (np.where(swap, dst, src).astype(np.uint64) << np.uint64(32)) | np.where(swap, src, dst)
+        k2 = ((np.where(swap, dport, sport).astype(np.uint64) << np.uint64(24))
+              | (np.where(swap, sport, dport).astype(np.uint64) << np.uint64(8))
+              | packets['proto'].astype(np.uint64))
+
+        ts = packets['ts']
+        self.latest_ts = max(self.latest_ts, ts.max())
+        order = np.lexsort((ts, k2, k1))
+        k1, k2, ts, from_a = k1[order], k2[order], ts[order], from_a[order]
+        payload = packets['payload'][order].astype(np.float64)
+        flags = packets['flags'][order]
+
+        # 每轮合并每个流键的当前流段，流结束后剩余的包留待下一轮作为新流
+        while len(ts):
+            taken = self._merge(k1, k2, ts, from_a, payload, flags)
+            if taken.all():
+                break
+            rest = ~taken
+            k1, k2, ts, from_a, payload, flags = k1[rest], k2[rest], ts[rest], from_a[rest], payload[rest], flags[rest]
+
+        # 首包早于 latest_ts - flow_timeout 的流不会再有包计入，可以输出
+        self._expire(self.latest_ts - self.flow_timeout)
+
+    def _merge(self, k1, k2, ts, from_a, payload, flags):
+        """把按 (流键, 时间) 排序的包中各流键的当前流段合并进累加表，返回已合并包的掩码"""
+        starts = np.flatnonzero(np.r_[True, (k1[1:] != k1[:-1]) | (k2[1:] != k2[:-1])])
+        group = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(ts)]))
+        flow_k1, flow_k2 = k1[starts], k2[starts]
+
+        # 查找本批各流所在的行
+        rows = np.full(len(starts), -1, dtype=np.int64)
+        for i, key in enumerate(zip(flow_k1.tolist(), flow_k2.tolist())):
+            row = self.rows.get(key)
+            if row is not None:
+                rows[i] = row
+
+        # 本批首包距流首包已超时的流先输出，本批的包作为新流
+        known = rows >= 0
+        stale = known.copy()
+        stale[known] = ts[starts][known] - self.acc['first_ts'][rows[known]] > self.flow_timeout
+        if stale.any():
+            self._emit(rows[stale])
+            rows[stale] = -1
+        new = rows < 0
+
+        # 流段在超时的包或结束流的 FIN 包之后截断；新流的首包带 FIN 不结束流
+        flow_start = np.where(new, ts[starts], self.acc['first_ts'][np.maximum(rows, 0)])
+        closing = (flags & TCP_FLAGS['FIN']) != 0
+        closing[starts[new]] = False
+        cut = ts - flow_start[group] > self.flow_timeout
+        cut[1:] |= closing[:-1]
+        cut[starts] = False
+        position = np.arange(len(ts))
+        first_cut = np.minimum.reduceat(np.where(cut, position, len(ts)), starts)
+        taken = position < first_cut[group]
+        if not taken.all():
+            k1, k2, ts, from_a, payload, flags = k1[taken], k2[taken], ts[taken], from_a[taken], payload[taken], flags[taken]
+            closing, group = closing[taken], group[taken]
+            starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+        ends = np.r_[starts[1:], len(ts)] - 1
+        ended = closing[ends] | (first_cut < len(position))
+
+        # 新流分配新行并以首包方向为正向
+        if new.any():
+            fresh = self._allocate(int(new.sum()))
+            rows[new] = fresh
+            self.rows.update(zip(zip(flow_k1[new].tolist(), flow_k2[new].tolist()), fresh.tolist()))
+            self.keys[fresh, 0] = flow_k1[new]
+            self.keys[fresh, 1] = flow_k2[new]
+            self.a_is_fwd[fresh] = from_a[starts][new]
+            self.active[fresh] = True
+
+        a_is_fwd = self.a_is_fwd[rows]
+        prev_last = np.where(new, np.nan, self.acc['last_ts'][rows])
+
+        fwd = from_a == a_is_fwd[group]
+        bwd = ~fwd
+
+        # 到达间隔：组内相邻包差值，组首包与上一批次的最后时间戳相减
+        iat = np.empty(len(ts))
+        iat[1:] = ts[1:] - ts[:-1]
+        iat[starts] = ts[starts] - prev_last
+        has_iat = ~np.isnan(iat)
+        iat = np.where(has_iat, np.maximum(iat, 0.0), 0.0)
+
+        batch = {
+            'first_ts': ts[starts],
+            'last_ts': np.maximum.reduceat(ts, starts),
+            'fwd_pkts': np.add.reduceat(fwd.astype(np.float64), starts),
+            'bwd_pkts': np.add.reduceat(bwd.astype(np.float64), starts),
+            'fwd_bytes': np.add.reduceat(payload * fwd, starts),
+            'bwd_bytes': np.add.reduceat(payload * bwd, starts),
+            'fwd_len_max': np.maximum.reduceat(np.where(fwd, payload, -np.inf), starts),
+            'fwd_len_min': np.minimum.reduceat(np.where(fwd, payload, np.inf), starts),
+            'bwd_len_max': np.maximum.reduceat(np.where(bwd, payload, -np.inf), starts),
+            'bwd_len_min': np.minimum.reduceat(np.where(bwd, payload, np.inf), starts),
+            'iat_n': np.add.reduceat(has_iat.astype(np.float64), starts),
+            'iat_sum': np.add.reduceat(iat, starts),
+            'iat_sumsq': np.add.reduceat(iat * iat, starts),
+            'iat_max': np.maximum.reduceat(np.where(has_iat, iat, -np.inf), starts),
+            'iat_min': np.minimum.reduceat(np.where(has_iat, iat, np.inf), starts),
+            **{f'{name.lower()}_cnt': np.add.reduceat(((flags & bit) != 0).astype(np.float64), starts)
+               for name, bit in TCP_FLAGS.items()},
+        }
+        # 每个流键只出现一次，可直接按行号合并
+        for name, how in STATE_AGG.items():
+            column = self.acc[name]
+            column[rows] = _COMBINE[how](column[rows], batch[name])
+
+        if ended.any():
+            self._emit(rows[ended])
+        return taken
+
+    def _expire(self, cutoff):
+        expired = self.active[:self.used] & (self.acc['first_ts'][:self.used] < cutoff)
+        if expired.any():
+            self._emit(np.flatnonzero(expired))
+
+    def _emit(self, rows):
+        """输出指定行的流并回收行号"""
+        index = pd.MultiIndex.from_arrays([self.keys[rows, 0], self.keys[rows, 1]], names=['k1', 'k2'])
+        self.finished.append(pd.DataFrame({
+            'a_is_fwd': self.a_is_fwd[rows],
+            **{name: self.acc[name][rows] for name in STATE_AGG},
+        }, index=index))
+
+        for key in zip(self.keys[rows, 0].tolist(), self.keys[rows, 1].tolist()):
+            del self.rows[key]
+        for name, how in STATE_AGG.items():
+            self.acc[name][rows] = _IDENTITY[how]
+        self.active[rows] = False
+        self.free.extend(rows.tolist())
+
+    def flush(self):
+        """输出所有流（包括仍处于活动状态的流）的特征"""
+        remaining = np.flatnonzero(self.active[:self.used])
+        if len(remaining):
+            self._emit(remaining)
+        if not self.finished:
+            return pd.DataFrame(columns=FEATURE_COLUMNS)
+        flows = pd.concat(self.finished)
+        self.finished = []
+        return flow_features(flows)
+
+
+def flow_features(flows):
+    """把流累加器换算为特征表（时间单位与 CICFlowMeter 一致，为微秒；长度为载荷字节数）"""
+    k1 = flows.index.get_level_values('k1').to_numpy(dtype=np.uint64)
+    k2 = flows.index.get_level_values('k2').to_numpy(dtype=np.uint64)
+    a_is_fwd = flows['a_is_fwd'].to_numpy(dtype=bool)
+    ip_a, ip_b = k1 >> np.uint64(32), k1 & np.uint64(0xffffffff)
+    port_a, port_b = k2 >> np.uint64(24), (k2 >> np.uint64(8)) & np.uint64(0xffff)
+    proto = (k2 & np.uint64(0xff)).astype(np.int64)
+
+    src_ip, dst_ip = np.where(a_is_fwd, ip_a, ip_b), np.where(a_is_fwd, ip_b, ip_a)
+    src_port, dst_port = np.where(a_is_fwd, port_a, port_b), np.where(a_is_fwd, port_b, port_a)
+    flow_id = [f"{_ip_str(s)}-{_ip_str(d)}-{sp}-{dp}-{p}"
+               for s, d, sp, dp, p in zip(src_ip, dst_ip, src_port, dst_port, proto)]
+
+    fwd_pkts = flows['fwd_pkts'].to_numpy().astype(np.int64)
+    bwd_pkts = flows['bwd_pkts'].to_numpy().astype(np.int64)
+    fwd_bytes = flows['fwd_bytes'].to_numpy().astype(np.int64)
+    bwd_bytes = flows['bwd_bytes'].to_numpy().astype(np.int64)
+    duration = flows['last_ts'].to_numpy() - flows['first_ts'].to_numpy()
+    iat_n = flows['iat_n'].to_numpy().astype(np.int64)
+    iat_mean = np.divide(flows['iat_sum'].to_numpy(), iat_n, out=np.zeros(len(flows)), where=iat_n > 0)
+    # 与 CICFlowMeter 一致使用样本标准差（n-1）
+    iat_var = np.divide(flows['iat_sumsq'].to_numpy() - iat_n * iat_mean ** 2, iat_n - 1,
+                        out=np.zeros(len(flows)), where=iat_n > 1)
+    iat_std = np.sqrt(np.maximum(iat_var, 0.0))
+    rate_base = np.where(duration > 0, duration, np.nan)
+
+    def per_packet(total, count):
+        return np.divide(total, count, out=np.zeros(len(flows)), where=count > 0)
+
+    def present(values, count):
+        return np.where(count > 0, values, 0)
+
+    features = pd.DataFrame({
+        'Destination Port': dst_port.astype(np.int64),
+        'Protocol': proto,
+        'Flow Duration': duration * 1e6,
+        'Total Fwd Packets': fwd_pkts,
+        'Total Backward Packets': bwd_pkts,
+        'Total Length of Fwd Packets': fwd_bytes,
+        'Total Length of Bwd Packets': bwd_bytes,
+        'Fwd Packet Length Max': present(flows['fwd_len_max'].to_numpy(), fwd_pkts),
+        'Fwd Packet Length Min': present(flows['fwd_len_min'].to_numpy(), fwd_pkts),
+        'Fwd Packet Length Mean': per_packet(fwd_bytes, fwd_pkts),
+        'Bwd Packet Length Max': present(flows['bwd_len_max'].to_numpy(), bwd_pkts),
+        'Bwd Packet Length Min': present(flows['bwd_len_min'].to_numpy(), bwd_pkts),
+        'Bwd Packet Length Mean': per_packet(bwd_bytes, bwd_pkts),
+        'Flow Bytes/s': np.nan_to_num((fwd_bytes + bwd_bytes) / rate_base),
+        'Flow Packets/s': np.nan_to_num((fwd_pkts + bwd_pkts) / rate_base),
+        'Flow IAT Mean': iat_mean * 1e6,
+        'Flow IAT Std': iat_std * 1e6,
+        'Flow IAT Max': present(flows['iat_max'].to_numpy(), iat_n) * 1e6,
+        'Flow IAT Min': present(flows['iat_min'].to_numpy(), iat_n) * 1e6,
+        **{f'{name} Flag Count': flows[f'{name.lower()}_cnt'].to_numpy().astype(np.int64) for name in TCP_FLAGS},
+    }, index=pd.Index(flow_id, name='Flow ID'))
+    return features[FEATURE_COLUMNS]
+
+
+def _ip_str(value):
+    value = int(value)
+    return f"{value >> 24}.{(value >> 16) & 0xff}.{(value >> 8) & 0xff}.{value & 0xff}"
+
+
+def extract_pcap(path, flow_timeout=FLOW_TIMEOUT, block_size=BLOCK_SIZE):
+    """从单个 pcap 文件提取流特征，返回 (特征表, 统计信息)"""
+    start = time.perf_counter()
+    table = FlowTable(flow_timeout)
+    total = ipv4 = 0
+    for packets in iter_pcap_blocks(path, block_size):
+        total += packets['total']
+        ipv4 += len(packets['ts'])
+        table.add_batch(packets)
+    features = table.flush()
+
+    seconds = time.perf_counter() - start
+    stats = {
+        'file': os.path.basename(path),
+        'packets': total,
+        'ipv4_packets': ipv4,
+        'flows': len(features),
+        'seconds': round(seconds, 4),
+        'pps': round(total / seconds) if seconds > 0 else 0,
+    }
+    if total >= MIN_PPS_PACKETS and stats['pps'] < TARGET_PPS:
+        logger.warning(f"{stats['file']} 吞吐 {stats['pps']} 包/秒，低于目标 {TARGET_PPS} 包/秒")
+    logger.info(json.dumps(stats, ensure_ascii=False))
+    return features, stats
+
+
+def extract_flows(paths, workers=None, flow_timeout=FLOW_TIMEOUT):
+    """并行提取多个 pcap 文件的流特征，按文件顺序合并"""
+    paths = list(paths)
+    if len(paths) == 1 or workers == 1:
+        results = [extract_pcap(path, flow_timeout) for path in paths]
+    else:
+        workers = workers or min(len(paths), os.cpu_count() or 1)
+        # 在 GUI 的后台线程中 fork 多线程进程可能死锁，显式使用 spawn
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            results = list(pool.map(extract_pcap, paths, [flow_timeout] * len(paths)))
+
+    frames = [features for features, _ in results if len(features)]
+    features = pd.concat(frames) if frames else pd.DataFrame(columns=FEATURE_COLUMNS)
+    return features, [stats for _, stats in results]
+
+
+def _normalize(name):
+    return re.sub(r'[^0-9a-z]', '', str(name).lower())
+
+
+def align_features(features, feature_names):
+    """按忽略大小写/空格/符号的方式把特征列重命名为模型特征名，返回 (特征表, 缺失特征)"""
+    if not feature_names:
+        return features, []
+    lookup = {_normalize(col): col for col in features.columns}
+    renames = {}
+    missing = []
+    for name in feature_names:
+        column = lookup.get(_normalize(name))
+        if column is None:
+            missing.append(name)
+        elif column != name:
+            renames[column] = name
+    return features.rename(columns=renames), missing
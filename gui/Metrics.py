@@ -0,0 +1,113 @@
+import numpy as np
+
+# 与界面判定一致的阈值：>0.5 为警告，>0.7 为高风险
+THRESHOLDS = (0.5, 0.7)
+
+# ROC-AUC 使用的概率直方图：在 logit 尺度上均匀分箱，
+# 覆盖 [sigmoid(-LOGIT_RANGE), sigmoid(LOGIT_RANGE)]，两端之外并入边缘箱
+AUC_BINS = 65536
+LOGIT_RANGE = 20.0
+
+
+class StreamingEvaluator:
+    """分块累积的二分类评估指标，只保存计数，不保留逐样本预测
+
+    多个分片各自 update 后可用 merge 合并，混淆矩阵与一次性计算完全相同。
+    ROC-AUC 由直方图计算，同一箱内的正负样本对按平局计 0.5，
+    误差不超过 auc_error_bound()（同箱正负样本对占比的一半）；
+    logit 分箱使集中在 0/1 附近的高置信度分数仍能被区分：箱宽在 p≈0.5 处约 1.5e-4，
+    在 p≈1-1e-4 处约 6e-8；差异小于箱宽的分数无法区分，由误差上界反映。
+    """
+
+    def __init__(self, thresholds=THRESHOLDS, bins=AUC_BINS, logit_range=LOGIT_RANGE):
+        self.thresholds = tuple(thresholds)
+        self.bins = bins
+        self.logit_range = logit_range
+        # 每个阈值的混淆矩阵 [[TN, FP], [FN, TP]]
+        self.confusion = {t: np.zeros((2, 2), dtype=np.int64) for t in self.thresholds}
+        self.pos_hist = np.zeros(bins, dtype=np.int64)
+        self.neg_hist = np.zeros(bins, dtype=np.int64)
+
+    def _bin_index(self, probs):
+        with np.errstate(divide='ignore'):
+            logit = np.log(probs) - np.log1p(-probs)
+        logit = np.clip(logit, -self.logit_range, self.logit_range)
+        idx = ((logit + self.logit_range) / (2 * self.logit_range) * self.bins).astype(np.int64)
+        return np.clip(idx, 0, self.bins - 1)
+
+    def update(self, y_true, probs):
+        """累积一个数据块；y_true 为 0/1 标签（缺失值跳过），probs 为正类概率"""
+        try:
+            y_true = np.asarray(y_true).astype(np.float64)
+        except (TypeError, ValueError):
+            raise ValueError("标签必须为 0/1 数值") from None
+        probs = np.asarray(probs, dtype=np.float64)
+        labeled = ~np.isnan(y_true)
+        y_true = y_true[labeled]
+        probs = probs[labeled]
+        if np.any((y_true != 0) & (y_true != 1)):
+            raise ValueError("标签只能为 0 或 1")
+        y_true = y_true.astype(np.int64)
+
+        for t in self.thresholds:
+            pred = (probs > t).astype(np.int64)
+            self.confusion[t] += np.bincount(y_true * 2 + pred, minlength=4).reshape(2, 2)
+
+        bin_idx = self._bin_index(probs)
+        self.pos_hist += np.bincount(bin_idx[y_true == 1], minlength=self.bins)
+        self.neg_hist += np.bincount(bin_idx[y_true == 0], minlength=self.bins)
+
+    def merge(self, other):
+        """合并另一个分片的累积结果"""
+        if (other.thresholds, other.bins, other.logit_range) != (self.thresholds, self.bins, self.logit_range):
+            raise ValueError("阈值或分箱设置不一致，无法合并")
+        for t in self.thresholds:
+            self.confusion[t] += other.confusion[t]
+        self.pos_hist += other.pos_hist
+        self.neg_hist += other.neg_hist
+        return self
+
+    @property
+    def count(self):
+        return int(self.pos_hist.sum() + self.neg_hist.sum())
+
+    def precision_recall(self, threshold):
+        (tn, fp), (fn, tp) = self.confusion[threshold]
+        precision = float(tp / (tp + fp)) if tp + fp else 0.0
+        recall = float(tp / (tp + fn)) if tp + fn else 0.0
+        return precision, recall
+
+    def roc_auc(self):
+        """按概率从高到低累积直方图，梯形积分；只有单一类别时返回 None"""
+        n_pos, n_neg = self.pos_hist.sum(), self.neg_hist.sum()
+        if n_pos == 0 or n_neg == 0:
+            return None
+        tpr = np.r_[0, np.cumsum(self.pos_hist[::-1])] / n_pos
+        fpr = np.r_[0, np.cumsum(self.neg_hist[::-1])] / n_neg
+        return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+
+    def auc_error_bound(self):
+        """ROC-AUC 与精确值之差的上界：落在同一箱内的正负样本对占比的一半
+
+        同分样本对的平局处理与 sklearn 一致，不产生误差，因此实际误差通常远小于该上界。
+        """
+        n_pos, n_neg = self.pos_hist.sum(), self.neg_hist.sum()
+        if n_pos == 0 or n_neg == 0:
+            return None
+        same_bin = np.sum(self.pos_hist.astype(np.float64) * self.neg_hist)
+        return float(same_bin / (2 * n_pos * n_neg))
+
+    def report(self):
+        """格式化为统计信息文本"""
+        lines = ["=== 模型评估 ===", f"已标注样本数: {self.count}"]
+        auc = self.roc_auc()
+        if auc is None:
+            lines.append("ROC-AUC: 无法计算（仅含单一类别）")
+        else:
+            lines.append(f"ROC-AUC: {auc:.4f}（误差上界 {self.auc_error_bound():.2g}）")
+        for t in self.thresholds:
+            (tn, fp), (fn, tp) = self.confusion[t]
+            precision, recall = self.precision_recall(t)
+            lines.append(f"阈值 {t}: 精确率 {precision:.4f}，召回率 {recall:.4f}")
+            lines.append(f"  混淆矩阵 TN={tn} FP={fp} FN={fn} TP={tp}")
+        return "\n".join(lines) + "\n"
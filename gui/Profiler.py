@@ -0,0 +1,243 @@
+import cProfile
+import ctypes
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows 下没有 resource 模块
+    resource = None
+
+logger = logging.getLogger('mlmet.profile')
+
+MB = 1024 * 1024
+
+
+class _ProcessMemoryCounters(ctypes.Structure):
+    """Windows PROCESS_MEMORY_COUNTERS 结构"""
+    _fields_ = [
+        ('cb', ctypes.c_uint32),
+        ('PageFaultCount', ctypes.c_uint32),
+        ('PeakWorkingSetSize', ctypes.c_size_t),
+        ('WorkingSetSize', ctypes.c_size_t),
+        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+        ('QuotaPagedPoolUsage', ctypes.c_size_t),
+        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+        ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+        ('PagefileUsage', ctypes.c_size_t),
+        ('PeakPagefileUsage', ctypes.c_size_t),
+    ]
+
+
+def _windows_memory():
+    counters = _ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    handle = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+        return None
+    return counters
+
+
+def get_rss_mb():
+    """返回进程当前常驻内存(MB)，平台不支持时返回 None"""
+    try:
+        if sys.platform.startswith('linux'):
+            with open('/proc/self/statm') as fh:
+                pages = int(fh.read().split()[1])
+            return pages * os.sysconf('SC_PAGE_SIZE') / MB
+        if sys.platform == 'win32':
+            counters = _windows_memory()
+            return counters.WorkingSetSize / MB if counters else None
+    except (OSError, ValueError, AttributeError):
+        pass
+    return None
+
+
+def get_rss_peak_mb():
+    """返回进程生命周期内的常驻内存峰值(MB)，平台不支持时返回 None"""
+    if resource is None:
+        if sys.platform == 'win32':
+            counters = _windows_memory()
+            return counters.PeakWorkingSetSize / MB if counters else None
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KB 为单位
+    if sys.platform == 'darwin':
+        return peak / MB
+    return peak / 1024
+
+
+def _delta(before, after):
+    if before is None or after is None:
+        return None
+    return round(after - before, 3)
+
+
+class StageProfiler:
+    """按操作记录各阶段耗时与内存变化，可选开启 cProfile/tracemalloc 深度剖析
+
+    默认记录每个阶段与整个操作前后的常驻内存变化；开启深度剖析后额外记录
+    tracemalloc 统计的 Python 分配峰值（相对阶段/操作开始时）。
+    """
+
+    def __init__(self, page_name, on_report=None, top_n=15, history=10):
+        self.page_name = page_name
+        self.on_report = on_report  # 每次操作结束后以报告文本回调
+        self.top_n = top_n
+        self.capture = False  # 深度剖析开关
+        self.last_record = None
+        self.history = deque(maxlen=history)  # 最近若干次操作的报告，最新的在前
+        self._local = threading.local()
+
+    def _current(self):
+        return getattr(self._local, 'current', None)
+
+    @contextmanager
+    def operation(self, name):
+        """记录一次完整操作；嵌套调用时退化为外层操作中的一个阶段"""
+        if self._current() is not None:
+            with self.stage(name):
+                yield self._current()
+            return
+
+        record = {'page': self.page_name, 'operation': name, 'status': 'ok', 'stages': []}
+        self._local.current = record
+
+        profile = None
+        started_tracing = False
+        if self.capture:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            record['_traced_base'] = tracemalloc.get_traced_memory()[0]
+            record['_traced_peak'] = record['_traced_base']
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # 其他线程的剖析器仍在运行
+                profile = None
+
+        rss_before = get_rss_mb()
+        peak_before = get_rss_peak_mb()
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception:
+            record['status'] = 'error'
+            raise
+        finally:
+            if profile is not None:
+                profile.disable()
+            record['seconds'] = round(time.perf_counter() - start, 6)
+            rss_delta = _delta(rss_before, get_rss_mb())
+            if rss_delta is not None:
+                record['rss_delta_mb'] = rss_delta
+            lifetime_peak = get_rss_peak_mb()
+            if lifetime_peak is not None:
+                # 本次操作把进程峰值推高了多少；为 0 说明峰值来自更早的操作
+                record['rss_peak_raise_mb'] = _delta(peak_before, lifetime_peak)
+                record['lifetime_rss_peak_mb'] = round(lifetime_peak, 2)
+            if '_traced_base' in record:
+                if tracemalloc.is_tracing():
+                    record['_traced_peak'] = max(record['_traced_peak'], tracemalloc.get_traced_memory()[1])
+                record['mem_peak_mb'] = round((record['_traced_peak'] - record['_traced_base']) / MB, 3)
+            record.pop('_traced_base', None)
+            record.pop('_traced_peak', None)
+            if started_tracing:
+                tracemalloc.stop()
+            self._local.current = None
+            self._finish(record, profile)
+
+    @contextmanager
+    def stage(self, name):
+        """记录当前操作中的一个阶段
+
+        阶段按开始顺序记录；嵌套阶段的 depth 比外层大 1，其耗时已包含在外层阶段中。
+        """
+        record = self._current()
+        depth = getattr(self._local, 'depth', 0)
+        stage = {'stage': name, 'depth': depth}
+        if record is not None:
+            record['stages'].append(stage)
+        self._local.depth = depth + 1
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            if record is not None and '_traced_peak' in record:
+                # 重置前先保留操作级峰值
+                record['_traced_peak'] = max(record['_traced_peak'], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+
+        rss_before = get_rss_mb()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            stage['seconds'] = round(time.perf_counter() - start, 6)
+            rss_delta = _delta(rss_before, get_rss_mb())
+            if rss_delta is not None:
+                stage['rss_delta_mb'] = rss_delta
+            if tracing and tracemalloc.is_tracing():
+                peak = tracemalloc.get_traced_memory()[1]
+                stage['mem_peak_mb'] = round((peak - baseline) / MB, 3)
+                if record is not None and '_traced_peak' in record:
+                    record['_traced_peak'] = max(record['_traced_peak'], peak)
+
+    def _finish(self, record, profile):
+        self.last_record = record
+        logger.info(json.dumps(record, ensure_ascii=False))
+
+        report = self.format_report(record)
+        if profile is not None:
+            stream = io.StringIO()
+            pstats.Stats(profile, stream=stream).sort_stats('cumulative').print_stats(self.top_n)
+            report += f"\n--- cProfile (前{self.top_n}项, 按累计耗时) ---\n{stream.getvalue()}"
+
+        self.history.appendleft(report)
+        if self.on_report is not None:
+            self.on_report(report)
+
+    def history_text(self):
+        """最近若干次操作的报告，最新的在前"""
+        return "\n".join(self.history)
+
+    @staticmethod
+    def format_report(record):
+        """把单次操作记录格式化为诊断面板文本"""
+        status = "" if record['status'] == 'ok' else " [失败]"
+        lines = [f"=== 性能诊断: {record['operation']}{status} 总耗时 {record['seconds']:.4f}s ==="]
+        for stage in record['stages']:
+            # 子阶段缩进显示在外层阶段之下，耗时已计入外层阶段
+            depth = stage.get('depth', 0)
+            prefix = "  " * (depth + 1) + ("└ " if depth else "")
+            line = f"{prefix}{stage['stage']}: {stage['seconds']:.4f}s"
+            if 'rss_delta_mb' in stage:
+                line += f"  常驻内存变化 {stage['rss_delta_mb']:+.2f}MB"
+            if 'mem_peak_mb' in stage:
+                line += f"  分配峰值 +{stage['mem_peak_mb']:.3f}MB"
+            lines.append(line)
+
+        memory = []
+        if 'rss_delta_mb' in record:
+            memory.append(f"常驻内存变化 {record['rss_delta_mb']:+.2f}MB")
+        if 'mem_peak_mb' in record:
+            memory.append(f"分配峰值 +{record['mem_peak_mb']:.3f}MB")
+        if record.get('rss_peak_raise_mb'):
+            memory.append(f"推高进程峰值 +{record['rss_peak_raise_mb']:.2f}MB")
+        if memory:
+            lines.append("本次操作: " + "，".join(memory))
+        if 'lifetime_rss_peak_mb' in record:
+            lines.append(f"进程生命周期内存峰值: {record['lifetime_rss_peak_mb']:.2f}MB")
+        return "\n".join(lines) + "\n"
@@ -50,6 +50,22 @@ import joblib
 import os
 from sklearn.base import BaseEstimator
 from wx.lib.scrolledpanel import ScrolledPanel
+from Profiler import StageProfiler
+from FlowExtractor import extract_flows, align_features, FEATURE_COLUMNS
+from Metrics import StreamingEvaluator
+from FeatureStore import FeatureStore, source_key, is_numeric_frame, iter_chunks, CHUNK_ROWS
+
+
+def format_feature_value(value):
+    """网格中显示的特征值：数值保留两位小数，字符串/类别原样显示"""
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+        return f"{value:.2f}"
+    return str(value)
+
+
+# PCAP 数据缺少模型特征时的补充说明
+PCAP_FEATURE_HINT = (f"（PCAP 只能提取 CICFlowMeter 约 78 项特征中的 {len(FEATURE_COLUMNS)} 项，"
+                     f"用完整 CIC 特征集训练的模型无法直接对 PCAP 评分）")
 
 
 class TrafficMonitoringPage(wx.Panel):
@@ -58,7 +74,12 @@ class TrafficMonitoringPage(wx.Panel):
         self.model = None
         self.feature_names = None  # 存储特征名
         self.traffic_data = None
-        self.target_data = None  # 存储目标变量
+        self.target_data = None  # 存储目标变量（无标签数据为 None）
+        self.dataset_key = None  # 当前数据来源标识，用于复用已物化的特征矩阵
+        self.from_pcap = False  # 当前数据是否由 PCAP 提取（特征名需随模型重新对齐）
+        self.feature_store = FeatureStore()
+        self.profiler = StageProfiler("流量监测",
+                                      on_report=lambda report: wx.CallAfter(self.ShowDiagnostics, report))
         self.InitUI()
 
     def InitUI(self):
@@ -78,11 +99,21 @@ class TrafficMonitoringPage(wx.Panel):
         self.load_data_btn.Bind(wx.EVT_BUTTON, self.OnLoadData)
         ctrl_sizer.Add(self.load_data_btn, 0, wx.ALL | wx.EXPAND, 5)
 
+        # PCAP 加载按钮（离线提取流特征）
+        self.load_pcap_btn = wx.Button(ctrl_panel, label="加载PCAP")
+        self.load_pcap_btn.Bind(wx.EVT_BUTTON, self.OnLoadPcap)
+        ctrl_sizer.Add(self.load_pcap_btn, 0, wx.ALL | wx.EXPAND, 5)
+
         # 分析按钮
         self.analyze_btn = wx.Button(ctrl_panel, label="开始分析")
         self.analyze_btn.Bind(wx.EVT_BUTTON, self.OnAnalyzeTraffic)
         ctrl_sizer.Add(self.analyze_btn, 0, wx.ALL | wx.EXPAND, 5)
 
+        # 深度剖析开关（cProfile/tracemalloc）
+        self.profile_checkbox = wx.CheckBox(ctrl_panel, label="深度剖析")
+        self.profile_checkbox.Bind(wx.EVT_CHECKBOX, self.OnToggleProfiling)
+        ctrl_sizer.Add(self.profile_checkbox, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+
         ctrl_panel.SetSizer(ctrl_sizer)
         main_sizer.Add(ctrl_panel, 0, wx.EXPAND)
 
@@ -108,6 +139,11 @@ class TrafficMonitoringPage(wx.Panel):
                                         style=wx.TE_MULTILINE | wx.TE_READONLY)
         bottom_sizer.Add(self.stats_output, 0, wx.EXPAND | wx.ALL, 5)
 
+        # 性能诊断面板
+        self.diag_output = wx.TextCtrl(self.bottom_panel, size=(100, 120),
+                                       style=wx.TE_MULTILINE | wx.TE_READONLY)
+        bottom_sizer.Add(self.diag_output, 0, wx.EXPAND | wx.ALL, 5)
+
         # 创建图表区域
         self.viz_panel = wx.Panel(self.bottom_panel)
         self.viz_sizer = wx.BoxSizer(wx.HORIZONTAL)
@@ -147,7 +183,9 @@ class TrafficMonitoringPage(wx.Panel):
         if dlg.ShowModal() == wx.ID_OK:
             pathname = dlg.GetPath()
             try:
-                saved_data = joblib.load(pathname)
+                with self.profiler.operation("加载模型"):
+                    with self.profiler.stage("模型反序列化"):
+                        saved_data = joblib.load(pathname)
                 self.model = saved_data['model']
                 self.feature_names = saved_data['feature_names']  # 加载特征名
                 wx.CallAfter(self.stats_output.AppendText,
@@ -169,18 +207,24 @@ class TrafficMonitoringPage(wx.Panel):
         if dlg.ShowModal() == wx.ID_OK:
             pathname = dlg.GetPath()
             try:
-                if pathname.endswith('.csv'):
-                    df = pd.read_csv(pathname)
-                else:
-                    df = pd.read_excel(pathname)
-
-                # 验证必要列是否存在
-                if 'Class' not in df.columns:
-                    raise ValueError("数据必须包含'Class'列")
-
-                # 分离特征和目标
-                self.target_data = df['Class']
-                self.traffic_data = df.drop('Class', axis=1)
+                with self.profiler.operation("加载数据"):
+                    with self.profiler.stage("文件解析"):
+                        if pathname.endswith('.csv'):
+                            df = pd.read_csv(pathname)
+                        else:
+                            df = pd.read_excel(pathname)
+
+                    # 分离特征和目标，'Class'列可选（生产流量没有标签）
+                    with self.profiler.stage("分离特征和目标"):
+                        if 'Class' in df.columns:
+                            self.target_data = df['Class']
+                            self.traffic_data = df.drop('Class', axis=1)
+                        else:
+                            self.target_data = None
+                            self.traffic_data = df
+                    self.dataset_key = source_key(pathname)
+                    self.from_pcap = False
+                    self.feature_store.release()
 
                 # 检查特征是否匹配
                 if hasattr(self, 'feature_names') and self.feature_names:
@@ -189,12 +233,64 @@ class TrafficMonitoringPage(wx.Panel):
                         wx.CallAfter(self.stats_output.AppendText,
                                      f"警告：缺少特征 {missing}\n")
 
-                wx.CallAfter(self.stats_output.AppendText,
-                             f"数据加载成功！\n样本数: {len(df)}\n正样本: {sum(df['Class'] == 1)}\n负样本: {sum(df['Class'] == 0)}\n")
+                if self.target_data is not None:
+                    wx.CallAfter(self.stats_output.AppendText,
+                                 f"数据加载成功！\n样本数: {len(df)}\n正样本: {sum(df['Class'] == 1)}\n负样本: {sum(df['Class'] == 0)}\n")
+                else:
+                    wx.CallAfter(self.stats_output.AppendText,
+                                 f"数据加载成功（无标签，仅打分）！\n样本数: {len(df)}\n")
             except Exception as e:
                 wx.MessageBox(f"加载数据失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
         dlg.Destroy()
 
+    def OnLoadPcap(self, event):
+        """从 pcap 文件提取双向流特征作为待检测数据"""
+        dlg = wx.FileDialog(
+            self, message="选择 PCAP 文件",
+            defaultDir=os.getcwd(),
+            defaultFile="",
+            wildcard="PCAP files (*.pcap)|*.pcap",
+            style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST | wx.FD_MULTIPLE
+        )
+
+        if dlg.ShowModal() == wx.ID_OK:
+            paths = dlg.GetPaths()
+            self.load_pcap_btn.Disable()
+            self.stats_output.AppendText(f"正在提取流特征（{len(paths)} 个文件）...\n")
+            # 提取耗时较长，放到后台线程避免界面卡顿
+            threading.Thread(target=self.ExtractPcap, args=(paths,), daemon=True).start()
+        dlg.Destroy()
+
+    def ExtractPcap(self, paths):
+        """后台提取流特征，完成后回到界面线程更新数据"""
+        try:
+            with self.profiler.operation("加载PCAP"):
+                with self.profiler.stage("流特征提取"):
+                    features, file_stats = extract_flows(paths)
+                with self.profiler.stage("特征名对齐"):
+                    features, missing = align_features(features, self.feature_names)
+            wx.CallAfter(self.OnPcapExtracted, features, file_stats, missing, source_key(*paths))
+        except Exception as e:
+            wx.CallAfter(wx.MessageBox, f"提取流特征失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
+        finally:
+            wx.CallAfter(self.load_pcap_btn.Enable)
+
+    def OnPcapExtracted(self, features, file_stats, missing, dataset_key):
+        """流特征提取完成"""
+        self.traffic_data = features
+        self.target_data = None  # pcap 中没有标签
+        self.dataset_key = dataset_key
+        self.from_pcap = True
+        self.feature_store.release()
+
+        for stats in file_stats:
+            self.stats_output.AppendText(
+                f"{stats['file']}: 包数 {stats['packets']}，流数 {stats['flows']}，"
+                f"耗时 {stats['seconds']:.2f}s，吞吐 {stats['pps']} 包/秒\n")
+        if missing:
+            self.stats_output.AppendText(f"警告：缺少特征 {set(missing)}\n{PCAP_FEATURE_HINT}\n")
+        self.stats_output.AppendText(f"流特征提取成功！\n流数: {len(features)}\n")
+
     def OnAnalyzeTraffic(self, event):
         """执行分析并可视化"""
         if not all([self.model, self.traffic_data is not None]):
@@ -202,79 +298,132 @@ class TrafficMonitoringPage(wx.Panel):
             return
 
         try:
-            # 特征顺序对齐
-            if hasattr(self, 'feature_names') and self.feature_names:
-                # 确保所有特征都存在
-                missing_features = [f for f in self.feature_names if f not in self.traffic_data.columns]
-                if missing_features:
-                    wx.MessageBox(f"数据中缺少以下特征: {', '.join(missing_features)}", "错误", wx.OK | wx.ICON_ERROR)
-                    return
-                X = self.traffic_data[self.feature_names]
-            else:
-                X = self.traffic_data
-
-            # 获取预测概率
-            risk_probs = self.model.predict_proba(X)[:, 1]
-            predictions = (risk_probs > 0.5).astype(int)
-
-            # 清空并初始化网格
-            self.grid.ClearGrid()
-            if self.grid.GetNumberRows() > 0:
-                self.grid.DeleteRows(0, self.grid.GetNumberRows())
-            if self.grid.GetNumberCols() != 4:
-                self.grid.DeleteCols(0, self.grid.GetNumberCols())
-                self.grid.AppendCols(4)
-                self.grid.SetColLabelValue(0, "ID")
-                self.grid.SetColLabelValue(1, "关键特征示例")
-                self.grid.SetColLabelValue(2, "预测概率")
-                self.grid.SetColLabelValue(3, "判定结果")
-
-            # 填充数据（显示高风险样本）
-            high_risk_count = 0
-            for idx, prob in enumerate(risk_probs, start=1):
-                if prob > 0.5:  # 高风险样本
-                    self.grid.AppendRows(1)
-                    row_pos = self.grid.GetNumberRows() - 1
-                    self.grid.SetCellValue(row_pos, 0, str(idx))
-
-                    # 显示前3个重要特征的值
-                    top_features = ", ".join([f"{X.columns[i]}={X.iloc[idx - 1, i]:.2f}"
-                                              for i in range(min(3, X.shape[1]))])
-                    self.grid.SetCellValue(row_pos, 1, top_features)
-
-                    self.grid.SetCellValue(row_pos, 2, f"{prob:.4f}")
-                    self.grid.SetCellValue(row_pos, 3, "高风险" if prob > 0.7 else "警告")
-                    high_risk_count += 1
-
-            # 统计信息输出
-            self.stats_output.Clear()
-            self.stats_output.AppendText("=== 分析结果 ===\n")
-            self.stats_output.AppendText(f"总样本数: {len(X)}\n")
-            self.stats_output.AppendText(f"高风险样本(>0.7): {sum(risk_probs > 0.7)}\n")
-            self.stats_output.AppendText(f"警告样本(0.5-0.7): {sum((risk_probs > 0.5) & (risk_probs <= 0.7))}\n")
-            self.stats_output.AppendText(f"安全样本: {sum(risk_probs <= 0.5)}\n")
-
-            if high_risk_count == 0:
-                self.stats_output.AppendText("\n未发现高风险样本\n")
-
-            # 高风险样本特征统计
-            if sum(risk_probs > 0.7) > 0:
-                high_risk_data = X[risk_probs > 0.7]
-                self.stats_output.AppendText("\n高风险样本特征均值:\n")
-                for feat in X.columns[:5]:  # 显示前5个特征
-                    self.stats_output.AppendText(f"{feat}: {high_risk_data[feat].mean():.2f}\n")
-
-            # 绘制可视化图表
-            self.visualize_results(risk_probs, predictions)
-
-            # 调整网格列宽
-            self.grid.AutoSizeColumns()
+            with self.profiler.operation("开始分析"):
+                # 特征顺序对齐
+                with self.profiler.stage("特征对齐"):
+                    if hasattr(self, 'feature_names') and self.feature_names:
+                        # PCAP 特征可能在加载模型之前提取，按当前模型的特征名重新对齐
+                        if self.from_pcap:
+                            self.traffic_data, _ = align_features(self.traffic_data, self.feature_names)
+                        # 确保所有特征都存在
+                        missing_features = [f for f in self.feature_names if f not in self.traffic_data.columns]
+                        if missing_features:
+                            hint = f"\n\n{PCAP_FEATURE_HINT}" if self.from_pcap else ""
+                            wx.MessageBox(f"数据中缺少以下特征: {', '.join(missing_features)}{hint}", "错误",
+                                          wx.OK | wx.ICON_ERROR)
+                            return
+                        columns = list(self.feature_names)
+                    else:
+                        columns = list(self.traffic_data.columns)
+                    if is_numeric_frame(self.traffic_data, columns):
+                        # 对齐后的特征矩阵只物化一次，之后的分析直接映射复用
+                        X = self.feature_store.get(self.dataset_key, self.traffic_data, columns)
+                    else:
+                        # 含字符串/类别特征时由模型流水线自行编码，直接按块传入原始数据
+                        X = self.traffic_data[columns]
+                    # 按 [行, 列] 位置取值，矩阵与数据表用法一致
+                    values = X.iloc if isinstance(X, pd.DataFrame) else X
+
+                # 按块获取预测概率
+                with self.profiler.stage("模型预测"):
+                    risk_probs = np.empty(len(X))
+                    for start, end, chunk in iter_chunks(X, columns):
+                        risk_probs[start:end] = self.model.predict_proba(chunk)[:, 1]
+                    predictions = (risk_probs > 0.5).astype(int)
+
+                # 有标签时逐块累积评估指标，与预测分开计时
+                labels = self.target_data.to_numpy() if self.target_data is not None else None
+                evaluator = eval_error = None
+                if labels is not None:
+                    with self.profiler.stage("模型评估"):
+                        evaluator = StreamingEvaluator()
+                        try:
+                            for start in range(0, len(risk_probs), CHUNK_ROWS):
+                                end = start + CHUNK_ROWS
+                                evaluator.update(labels[start:end], risk_probs[start:end])
+                        except (TypeError, ValueError) as e:
+                            # 标签无法评估（如字符串或多分类标签）时只输出打分结果
+                            evaluator, eval_error = None, str(e)
+
+                with self.profiler.stage("网格填充"):
+                    # 清空并初始化网格
+                    self.grid.ClearGrid()
+                    if self.grid.GetNumberRows() > 0:
+                        self.grid.DeleteRows(0, self.grid.GetNumberRows())
+                    if self.grid.GetNumberCols() != 4:
+                        self.grid.DeleteCols(0, self.grid.GetNumberCols())
+                        self.grid.AppendCols(4)
+                        self.grid.SetColLabelValue(0, "ID")
+                        self.grid.SetColLabelValue(1, "关键特征示例")
+                        self.grid.SetColLabelValue(2, "预测概率")
+                        self.grid.SetColLabelValue(3, "判定结果")
+
+                    # 填充数据（显示高风险样本）
+                    high_risk_count = 0
+                    for idx, prob in enumerate(risk_probs, start=1):
+                        if prob > 0.5:  # 高风险样本
+                            self.grid.AppendRows(1)
+                            row_pos = self.grid.GetNumberRows() - 1
+                            self.grid.SetCellValue(row_pos, 0, str(idx))
+
+                            # 显示前3个重要特征的值
+                            top_features = ", ".join([f"{columns[i]}={format_feature_value(values[idx - 1, i])}"
+                                                      for i in range(min(3, len(columns)))])
+                            self.grid.SetCellValue(row_pos, 1, top_features)
+
+                            self.grid.SetCellValue(row_pos, 2, f"{prob:.4f}")
+                            self.grid.SetCellValue(row_pos, 3, "高风险" if prob > 0.7 else "警告")
+                            high_risk_count += 1
+
+                # 统计信息输出
+                with self.profiler.stage("统计汇总"):
+                    self.stats_output.Clear()
+                    self.stats_output.AppendText("=== 分析结果 ===\n")
+                    self.stats_output.AppendText(f"总样本数: {len(X)}\n")
+                    self.stats_output.AppendText(f"高风险样本(>0.7): {sum(risk_probs > 0.7)}\n")
+                    self.stats_output.AppendText(f"警告样本(0.5-0.7): {sum((risk_probs > 0.5) & (risk_probs <= 0.7))}\n")
+                    self.stats_output.AppendText(f"安全样本: {sum(risk_probs <= 0.5)}\n")
+
+                    if high_risk_count == 0:
+                        self.stats_output.AppendText("\n未发现高风险样本\n")
+
+                    # 高风险样本特征统计
+                    if sum(risk_probs > 0.7) > 0:
+                        high_risk = risk_probs > 0.7
+                        self.stats_output.AppendText("\n高风险样本特征均值:\n")
+                        for i, feat in enumerate(columns[:5]):  # 显示前5个特征
+                            column = values[high_risk, i]
+                            if pd.api.types.is_numeric_dtype(column.dtype):
+                                self.stats_output.AppendText(f"{feat}: {column.mean():.2f}\n")
+
+                # 有标签时输出评估结果
+                if labels is not None:
+                    if evaluator is not None:
+                        self.stats_output.AppendText("\n" + evaluator.report())
+                    else:
+                        self.stats_output.AppendText(f"\n无法评估模型: {eval_error}（仅输出打分结果）\n")
+
+                # 绘制可视化图表
+                with self.profiler.stage("图表绘制"):
+                    self.visualize_results(risk_probs, predictions)
+
+                # 调整网格列宽
+                with self.profiler.stage("列宽调整"):
+                    self.grid.AutoSizeColumns()
 
         except Exception as e:
             import traceback
             err_msg = traceback.format_exc()
             wx.MessageBox(f"分析出错: {str(e)}\n\n详细信息:\n{err_msg}", "错误", wx.OK | wx.ICON_ERROR)
 
+    def OnToggleProfiling(self, event):
+        """切换 cProfile/tracemalloc 深度剖析"""
+        self.profiler.capture = event.IsChecked()
+
+    def ShowDiagnostics(self, report):
+        """在诊断面板显示最近几次操作的性能报告（最新的在前）"""
+        self.diag_output.SetValue(self.profiler.history_text())
+
     def visualize_results(self, risk_probs, predictions):
         """生成可视化结果"""
         try:
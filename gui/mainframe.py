@@ -1,3 +1,4 @@
+import logging
 import wx
 from DataPreprocess import DataPreprocessingPage
 from TrafficMonitor import TrafficMonitoringPage
@@ -27,6 +28,12 @@ class MainFrame(wx.Frame):
 
 
 if __name__ == '__main__':
+    # 性能诊断以结构化 JSON 形式输出到日志；只开启本程序的 mlmet 日志，不改变第三方库的日志级别
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(levelname)s %(message)s'))
+    mlmet_logger = logging.getLogger('mlmet')
+    mlmet_logger.addHandler(handler)
+    mlmet_logger.setLevel(logging.INFO)
     app = wx.App(False)
     frame = MainFrame()
     app.MainLoop()
\ No newline at end of file
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# gui 下的模块以顶层模块方式互相导入（与 mainframe.py 的运行方式一致）
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gui'))
@@ -0,0 +1,175 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+import FeatureStore as feature_store
+from FeatureStore import FeatureStore, CHUNK_ROWS, STALE_TMP_SECONDS, is_numeric_frame, iter_chunks
+
+
+def frame(rows=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Flow Duration': rng.uniform(0, 1e6, rows),
+        'Destination Port': rng.integers(0, 65536, rows),
+        'Protocol': rng.choice([6, 17], rows),
+    })
+
+
+def test_round_trip_in_requested_column_order(tmp_path):
+    data = frame(CHUNK_ROWS + 10)
+    columns = ['Protocol', 'Flow Duration']
+    X = FeatureStore(str(tmp_path)).get('a', data, columns)
+
+    assert isinstance(X, np.memmap)
+    assert X.dtype == np.float32 and X.flags['C_CONTIGUOUS']
+    np.testing.assert_array_equal(X, data[columns].to_numpy(dtype=np.float32))
+
+
+def test_reuses_materialized_matrix_without_frame(tmp_path):
+    data = frame()
+    FeatureStore(str(tmp_path)).get('a', data, list(data.columns))
+    # 新的存储对象（如重启后）不再需要原始数据
+    X = FeatureStore(str(tmp_path)).get('a', None, list(data.columns))
+    np.testing.assert_array_equal(X, data.to_numpy(dtype=np.float32))
+
+
+def test_key_includes_dataset_and_columns(tmp_path):
+    data = frame()
+    store = FeatureStore(str(tmp_path))
+    X1 = store.get('a', data, ['Protocol', 'Flow Duration'])
+    X2 = store.get('a', data, ['Flow Duration', 'Protocol'])
+    X3 = store.get('b', frame(seed=1), ['Protocol', 'Flow Duration'])
+    assert len({X1.filename, X2.filename, X3.filename}) == 3
+    np.testing.assert_array_equal(X1[:, 0], X2[:, 1])
+
+
+def test_empty_frame(tmp_path):
+    X = FeatureStore(str(tmp_path)).get('a', frame(0), ['Protocol'])
+    assert X.shape == (0, 1)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    data = frame()
+    size = len(data) * 4
+    store = FeatureStore(str(tmp_path), max_bytes=2 * size)
+    store.get('a', data, ['Protocol'])
+    store.get('b', data, ['Protocol'])
+    store.release()
+    # 重新打开 a，使 b 成为最久未使用的
+    old = os.path.getmtime(store._paths('b', ['Protocol'])[1]) - 10
+    os.utime(store._paths('b', ['Protocol'])[1], (old, old))
+    store.get('a', None, ['Protocol'])
+    store.get('c', data, ['Protocol'])
+
+    assert all(os.path.exists(p) for p in store._paths('a', ['Protocol']))
+    assert all(os.path.exists(p) for p in store._paths('c', ['Protocol']))
+    assert not any(os.path.exists(p) for p in store._paths('b', ['Protocol']))
+
+
+def test_does_not_evict_open_matrices(tmp_path):
+    data = frame()
+    store = FeatureStore(str(tmp_path), max_bytes=0)
+    X = store.get('a', data, ['Protocol'])
+    store.get('b', data, ['Protocol'])
+    assert os.path.exists(X.filename)
+    np.testing.assert_array_equal(X[:, 0], data['Protocol'].to_numpy(dtype=np.float32))
+
+
+def test_column_transformer_pipeline_scores_wrapped_chunks(tmp_path):
+    data = frame(500)
+    y = (data['Protocol'] == 6).astype(int)
+    columns = ['Flow Duration', 'Protocol']
+    model = make_pipeline(
+        ColumnTransformer([('scale', StandardScaler(), columns)]),
+        LogisticRegression(),
+    ).fit(data, y)
+
+    X = FeatureStore(str(tmp_path)).get('a', data, columns)
+    with pytest.raises(ValueError):
+        # 裸矩阵没有列名，按列名选取特征的流水线无法使用
+        model.predict_proba(X[:100])
+    probs = np.concatenate([model.predict_proba(chunk)[:, 1] for _, _, chunk in iter_chunks(X, columns, 64)])
+    np.testing.assert_allclose(probs, model.predict_proba(data)[:, 1], atol=1e-5)
+
+
+def test_categorical_features_score_original_frame(tmp_path):
+    # 含字符串特征时不物化，按块传入原始数据，由流水线中的 OneHotEncoder 编码
+    data = frame(500)
+    data['Service'] = np.where(data['Protocol'] == 6, 'modbus', 'dns')
+    y = (data['Service'] == 'modbus').astype(int)
+    columns = ['Flow Duration', 'Service']
+    model = make_pipeline(
+        ColumnTransformer([('scale', StandardScaler(), ['Flow Duration']),
+                           ('onehot', OneHotEncoder(), ['Service'])]),
+        LogisticRegression(),
+    ).fit(data, y)
+
+    assert is_numeric_frame(data, ['Flow Duration', 'Protocol'])
+    assert not is_numeric_frame(data, columns)
+    probs = np.concatenate([model.predict_proba(chunk)[:, 1] for _, _, chunk in iter_chunks(data, columns, 64)])
+    np.testing.assert_allclose(probs, model.predict_proba(data)[:, 1])
+
+
+def test_failed_materialize_leaves_no_files(tmp_path):
+    data = frame(CHUNK_ROWS + 10)
+    data['Protocol'] = data['Protocol'].astype(object)
+    data.loc[CHUNK_ROWS + 5, 'Protocol'] = 'n/a'
+    store = FeatureStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.get('a', data, ['Flow Duration', 'Protocol'])
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize('damage', ['truncate', 'meta'])
+def test_damaged_entry_is_rebuilt(tmp_path, damage):
+    data = frame()
+    columns = list(data.columns)
+    store = FeatureStore(str(tmp_path))
+    store.get('a', data, columns)
+    data_path, meta_path = store._paths('a', columns)
+    if damage == 'truncate':
+        with open(data_path, 'r+b') as fh:
+            fh.truncate(100)
+    else:
+        with open(meta_path, 'w') as fh:
+            fh.write('{')
+
+    X = FeatureStore(str(tmp_path)).get('a', data, columns)
+    np.testing.assert_array_equal(X, data.to_numpy(dtype=np.float32))
+
+
+def test_stale_tmp_files_are_cleaned(tmp_path):
+    stale = tmp_path / 'abc.f32.123.tmp'
+    recent = tmp_path / 'def.f32.456.tmp'
+    stale.write_bytes(b'x')
+    recent.write_bytes(b'x')
+    old = stale.stat().st_mtime - STALE_TMP_SECONDS - 10
+    os.utime(stale, (old, old))
+    FeatureStore(str(tmp_path)).get('a', frame(), ['Protocol'])
+    assert not stale.exists()
+    assert recent.exists()
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason="仅 POSIX 检查目录所有者")
+def test_cache_dir_is_private(tmp_path, monkeypatch):
+    shared = tmp_path / 'shared'
+    shared.mkdir()
+    shared.chmod(0o777)
+    FeatureStore(str(shared)).get('a', frame(), ['Protocol'])
+    assert shared.stat().st_mode & 0o777 == 0o700
+
+    monkeypatch.setattr(feature_store.os, 'getuid', lambda: shared.stat().st_uid + 1)
+    with pytest.raises(PermissionError):
+        FeatureStore(str(shared)).get('b', frame(), ['Protocol'])
+
+
+def test_default_cache_dir_is_per_user(monkeypatch):
+    monkeypatch.setattr(feature_store.sys, 'platform', 'linux')
+    monkeypatch.setenv('XDG_CACHE_HOME', '/home/alice/.cache')
+    assert feature_store._user_cache_dir() == os.path.join('/home/alice/.cache', 'mlmet', 'features')
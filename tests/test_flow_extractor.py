@@ -0,0 +1,193 @@
+import socket
+import struct
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from FlowExtractor import extract_pcap, extract_flows, align_features, FEATURE_COLUMNS
+
+CLIENT, SERVER = '10.0.0.2', '10.0.0.1'
+SYN, ACK, PSH, FIN = 0x02, 0x10, 0x08, 0x01
+
+
+def tcp(src, dst, sport, dport, flags=ACK, payload=0, options=0):
+    header = struct.pack('>HHIIBBHHH', sport, dport, 0, 0, (5 + options) << 4, flags, 0, 0, 0)
+    return 6, header + b'\0' * (4 * options) + b'x' * payload
+
+
+def udp(src, dst, sport, dport, payload=0):
+    return 17, struct.pack('>HHHH', sport, dport, 8 + payload, 0) + b'x' * payload
+
+
+def ipv4(src, dst, segment, frag_offset=0, more_fragments=False):
+    proto, body = segment
+    flags_frag = (0x2000 if more_fragments else 0) | frag_offset
+    header = struct.pack('>BBHHHBBH4s4s', 0x45, 0, 20 + len(body), 0, flags_frag, 64, proto, 0,
+                         socket.inet_aton(src), socket.inet_aton(dst))
+    return header + body
+
+
+def ethernet(payload, vlan=False, ethertype=0x0800):
+    tag = struct.pack('>HH', 0x8100, 7) if vlan else b''
+    return b'\0' * 12 + tag + struct.pack('>H', ethertype) + payload
+
+
+def write_pcap(path, packets, endian='<', nanoseconds=False, linktype=1):
+    """packets 为 (时间戳秒, 帧字节) 列表"""
+    magic = 0xa1b23c4d if nanoseconds else 0xa1b2c3d4
+    scale = 1e9 if nanoseconds else 1e6
+    with open(path, 'wb') as fh:
+        fh.write(struct.pack(endian + 'IHHiIII', magic, 2, 4, 0, 0, 65535, linktype))
+        for ts, frame in packets:
+            sec = int(ts)
+            frac = int(round((ts - sec) * scale))
+            fh.write(struct.pack(endian + 'IIII', sec, frac, len(frame), len(frame)) + frame)
+    return str(path)
+
+
+def handshake(t0=100.0, vlan=False):
+    """客户端 -> 服务器 502 端口的一条 TCP 流，时间间隔 0.1/0.2/0.3 秒"""
+    return [
+        (t0, ethernet(ipv4(CLIENT, SERVER, tcp(CLIENT, SERVER, 40000, 502, SYN)), vlan)),
+        (t0 + 0.1, ethernet(ipv4(SERVER, CLIENT, tcp(SERVER, CLIENT, 502, 40000, SYN | ACK)), vlan)),
+        (t0 + 0.3, ethernet(ipv4(CLIENT, SERVER, tcp(CLIENT, SERVER, 40000, 502, PSH | ACK, 100, options=3)), vlan)),
+        (t0 + 0.6, ethernet(ipv4(SERVER, CLIENT, tcp(SERVER, CLIENT, 502, 40000, FIN | ACK, 50)), vlan)),
+    ]
+
+
+def test_bidirectional_tcp_flow_features(tmp_path):
+    features, stats = extract_pcap(write_pcap(tmp_path / 'a.pcap', handshake()))
+
+    assert stats['packets'] == stats['ipv4_packets'] == 4
+    assert list(features.columns) == FEATURE_COLUMNS
+    assert list(features.index) == [f"{CLIENT}-{SERVER}-40000-502-6"]
+    flow = features.iloc[0]
+    assert flow['Destination Port'] == 502
+    assert flow['Protocol'] == 6
+    assert flow['Flow Duration'] == pytest.approx(0.6e6, abs=1)
+    assert (flow['Total Fwd Packets'], flow['Total Backward Packets']) == (2, 2)
+    # 长度为传输层载荷：SYN/SYN-ACK 为 0，TCP 选项不计入载荷
+    assert (flow['Total Length of Fwd Packets'], flow['Total Length of Bwd Packets']) == (100, 50)
+    assert (flow['Fwd Packet Length Max'], flow['Fwd Packet Length Min']) == (100, 0)
+    assert flow['Fwd Packet Length Mean'] == 50
+    assert flow['Bwd Packet Length Mean'] == 25
+    assert flow['Flow Bytes/s'] == pytest.approx(150 / 0.6, rel=1e-4)
+    assert flow['Flow Packets/s'] == pytest.approx(4 / 0.6, rel=1e-4)
+    iat = np.array([0.1, 0.2, 0.3]) * 1e6
+    assert flow['Flow IAT Mean'] == pytest.approx(iat.mean(), abs=1)
+    assert flow['Flow IAT Std'] == pytest.approx(iat.std(ddof=1), abs=1)
+    assert (flow['Flow IAT Max'], flow['Flow IAT Min']) == (pytest.approx(3e5, abs=1), pytest.approx(1e5, abs=1))
+    assert flow['SYN Flag Count'] == 2
+    assert flow['ACK Flag Count'] == 3
+    assert flow['PSH Flag Count'] == 1
+    assert flow['FIN Flag Count'] == 1
+
+
+def test_vlan_tagged_frames_match_untagged(tmp_path):
+    plain, _ = extract_pcap(write_pcap(tmp_path / 'plain.pcap', handshake()))
+    tagged, _ = extract_pcap(write_pcap(tmp_path / 'vlan.pcap', handshake(vlan=True)))
+    pd.testing.assert_frame_equal(plain, tagged)
+
+
+def test_big_endian_nanosecond_header(tmp_path):
+    plain, _ = extract_pcap(write_pcap(tmp_path / 'plain.pcap', handshake()))
+    other, _ = extract_pcap(write_pcap(tmp_path / 'be.pcap', handshake(), endian='>', nanoseconds=True))
+    pd.testing.assert_frame_equal(plain, other, atol=1)
+
+
+def test_udp_fragments_and_non_ip(tmp_path):
+    packets = [
+        (1.0, ethernet(ipv4(CLIENT, SERVER, udp(CLIENT, SERVER, 5000, 53, 30)))),
+        # 首个分片带端口；后续分片没有传输层头部，归入端口为 0 的流
+        (1.1, ethernet(ipv4(CLIENT, SERVER, udp(CLIENT, SERVER, 5000, 53, 72), more_fragments=True))),
+        (1.2, ethernet(ipv4(CLIENT, SERVER, (17, b'y' * 40), frag_offset=10))),
+        (1.3, ethernet(b'\0' * 28, ethertype=0x0806)),  # ARP
+    ]
+    features, stats = extract_pcap(write_pcap(tmp_path / 'frag.pcap', packets))
+
+    assert stats['packets'] == 4
+    assert stats['ipv4_packets'] == 3
+    flow = features.loc[f"{CLIENT}-{SERVER}-5000-53-17"]
+    assert flow['Total Fwd Packets'] == 2
+    assert flow['Total Length of Fwd Packets'] == 30 + 72
+    fragment = features.loc[f"{CLIENT}-{SERVER}-0-0-17"]
+    assert fragment['Total Length of Fwd Packets'] == 40
+
+
+def many_flows(count=300, rounds=20):
+    packets = []
+    t = 0.0
+    for r in range(rounds):
+        for i in range(count):
+            client = f"10.1.{i // 200}.{i % 200 + 1}"
+            t += 0.001
+            if (i + r) % 3:
+                packets.append((t, ethernet(ipv4(client, SERVER, tcp(client, SERVER, 30000 + i, 502, ACK, i % 40)),
+                                            vlan=i % 5 == 0)))
+            else:
+                packets.append((t, ethernet(ipv4(SERVER, client, tcp(SERVER, client, 502, 30000 + i, PSH, r)))))
+    return packets
+
+
+def test_flows_spanning_blocks_match_single_block(tmp_path):
+    path = write_pcap(tmp_path / 'many.pcap', many_flows())
+    whole, _ = extract_pcap(path)
+    # 块大小远小于文件，流跨越多个块，部分记录被切在块边界上
+    split, _ = extract_pcap(path, block_size=997)
+
+    assert len(whole) == 300
+    # IAT 标准差由平方和计算，分块累加顺序不同会带来 1e-3 微秒量级的舍入差异
+    pd.testing.assert_frame_equal(whole.sort_index(), split.sort_index(), atol=1e-2)
+
+
+@pytest.mark.parametrize('block_size', [200, 16 * 1024 * 1024])
+def test_flow_timeout_splits_long_flow(tmp_path, block_size):
+    # 与 CICFlowMeter 一致，超时从流首包算起而非空闲时间：每 10 秒一个包持续 1000 秒的会话
+    # 被切分为每段最长 120 秒的流，无论是否落在同一块内
+    packets = [(100.0 + 10 * i, ethernet(ipv4(CLIENT, SERVER, tcp(CLIENT, SERVER, 40000, 502, PSH | ACK, 12))))
+               for i in range(101)]
+    features, _ = extract_pcap(write_pcap(tmp_path / 'modbus.pcap', packets), block_size=block_size)
+
+    assert len(features) == 8
+    assert features['Flow Duration'].max() == pytest.approx(1.2e8, abs=1)
+    assert features['Total Fwd Packets'].tolist() == [13] * 7 + [10]
+    assert features['Total Fwd Packets'].sum() == 101
+
+
+@pytest.mark.parametrize('block_size', [200, 16 * 1024 * 1024])
+def test_fin_ends_flow(tmp_path, block_size):
+    # 同一五元组在 FIN 之后立即复用，应成为两条流；流首包带 FIN 不结束流
+    packets = handshake(t0=100.0) + handshake(t0=101.0)
+    packets.append((102.0, ethernet(ipv4(CLIENT, SERVER, tcp(CLIENT, SERVER, 40001, 502, FIN | ACK)))))
+    packets.append((102.1, ethernet(ipv4(SERVER, CLIENT, tcp(SERVER, CLIENT, 502, 40001, ACK)))))
+    features, _ = extract_pcap(write_pcap(tmp_path / 'fin.pcap', packets), block_size=block_size)
+
+    handshakes = features.loc[f"{CLIENT}-{SERVER}-40000-502-6"]
+    assert len(handshakes) == 2
+    assert (handshakes['Total Fwd Packets'] == 2).all()
+    assert handshakes['Flow Duration'].to_numpy() == pytest.approx([0.6e6] * 2, abs=1)
+    assert features.loc[f"{CLIENT}-{SERVER}-40001-502-6", 'Total Backward Packets'] == 1
+
+
+def test_extract_flows_parallel_matches_sequential(tmp_path):
+    paths = [write_pcap(tmp_path / 'a.pcap', handshake()), write_pcap(tmp_path / 'b.pcap', many_flows(50, 4))]
+    sequential, _ = extract_flows(paths, workers=1)
+    parallel, stats = extract_flows(paths, workers=2)
+    pd.testing.assert_frame_equal(sequential, parallel)
+    assert [s['file'] for s in stats] == ['a.pcap', 'b.pcap']
+
+
+def test_rejects_pcapng(tmp_path):
+    path = tmp_path / 'x.pcapng'
+    path.write_bytes(struct.pack('<IIIHHq', 0x0a0d0d0a, 28, 0x1a2b3c4d, 1, 0, -1))
+    with pytest.raises(ValueError):
+        extract_pcap(str(path))
+
+
+def test_align_features_matches_cic_style_names():
+    features = pd.DataFrame(np.zeros((1, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS)
+    aligned, missing = align_features(features, [' Destination Port', 'flow_iat_mean', 'Init_Win_bytes_forward'])
+    assert ' Destination Port' in aligned.columns
+    assert 'flow_iat_mean' in aligned.columns
+    assert missing == ['Init_Win_bytes_forward']
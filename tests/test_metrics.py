@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+from sklearn.metrics import confusion_matrix, precision_score, recall_score, roc_auc_score
+
+from Metrics import StreamingEvaluator, THRESHOLDS
+
+
+def scores(n=50000, seed=0):
+    rng = np.random.default_rng(seed)
+    y = rng.integers(0, 2, n)
+    p = 1 / (1 + np.exp(-rng.normal(2.5 * y - 1.2, 1.5)))
+    return y, p
+
+
+def test_matches_sklearn_single_pass():
+    y, p = scores()
+    evaluator = StreamingEvaluator()
+    evaluator.update(y, p)
+
+    assert evaluator.roc_auc() == pytest.approx(roc_auc_score(y, p), abs=evaluator.auc_error_bound())
+    assert evaluator.auc_error_bound() < 1e-3
+    for t in THRESHOLDS:
+        pred = (p > t).astype(int)
+        assert evaluator.confusion[t].tolist() == confusion_matrix(y, pred).tolist()
+        precision, recall = evaluator.precision_recall(t)
+        assert precision == pytest.approx(precision_score(y, pred))
+        assert recall == pytest.approx(recall_score(y, pred))
+
+
+@pytest.mark.parametrize('low, high', [(0.9999, 0.99999), (1e-7, 1e-5), (0.5, 0.505)])
+def test_auc_with_concentrated_scores(low, high):
+    rng = np.random.default_rng(1)
+    mid = (low + high) / 2
+    neg = rng.uniform(low, mid, 5000)
+    pos = rng.uniform(mid, high, 5000)
+    y = np.r_[np.zeros(5000), np.ones(5000)]
+    p = np.r_[neg, pos]
+
+    evaluator = StreamingEvaluator()
+    evaluator.update(y, p)
+    exact = roc_auc_score(y, p)
+    assert exact == 1.0
+    assert abs(evaluator.roc_auc() - exact) <= evaluator.auc_error_bound() + 1e-12
+    assert evaluator.roc_auc() > 0.99
+
+
+def test_auc_error_bound_holds_when_scores_saturate():
+    # 概率超出 logit 覆盖范围时并入边缘箱，误差上界如实反映这一点
+    y = np.r_[np.zeros(100), np.ones(100)]
+    p = np.r_[np.full(100, 1 - 1e-12), np.full(100, 1 - 1e-13)]
+    evaluator = StreamingEvaluator()
+    evaluator.update(y, p)
+    assert roc_auc_score(y, p) == 1.0
+    assert evaluator.roc_auc() == pytest.approx(0.5)
+    assert evaluator.auc_error_bound() == pytest.approx(0.5)
+
+
+def test_chunked_and_merged_equal_single_pass():
+    y, p = scores(30001, seed=2)
+    single = StreamingEvaluator()
+    single.update(y, p)
+
+    chunked = StreamingEvaluator()
+    for start in range(0, len(y), 4096):
+        chunked.update(y[start:start + 4096], p[start:start + 4096])
+
+    shards = [StreamingEvaluator() for _ in range(3)]
+    for i, shard in enumerate(shards):
+        shard.update(y[i::3], p[i::3])
+    merged = shards[0].merge(shards[1]).merge(shards[2])
+
+    for other in (chunked, merged):
+        for t in THRESHOLDS:
+            assert other.confusion[t].tolist() == single.confusion[t].tolist()
+        assert other.roc_auc() == single.roc_auc()
+        assert other.count == single.count == len(y)
+
+
+def test_missing_labels_are_skipped():
+    evaluator = StreamingEvaluator()
+    evaluator.update(np.array([1.0, np.nan, 0.0]), np.array([0.9, 0.8, 0.1]))
+    assert evaluator.count == 2
+    assert evaluator.roc_auc() == 1.0
+
+
+@pytest.mark.parametrize('labels', [np.array(['BENIGN', 'DDoS']), np.array([0, 2])])
+def test_rejects_non_binary_labels(labels):
+    with pytest.raises(ValueError):
+        StreamingEvaluator().update(labels, np.array([0.1, 0.9]))
+
+
+def test_single_class_and_report():
+    evaluator = StreamingEvaluator()
+    evaluator.update(np.zeros(10), np.linspace(0, 1, 10))
+    assert evaluator.roc_auc() is None
+    report = evaluator.report()
+    assert "无法计算" in report
+    assert "TN=" in report
+
+
+def test_merge_rejects_mismatched_settings():
+    with pytest.raises(ValueError):
+        StreamingEvaluator().merge(StreamingEvaluator(bins=1024))
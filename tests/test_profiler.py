@@ -0,0 +1,74 @@
+import pytest
+
+from Profiler import StageProfiler
+
+
+def test_operation_records_stages_and_memory_delta():
+    reports = []
+    profiler = StageProfiler("测试", on_report=reports.append)
+    with profiler.operation("操作"):
+        with profiler.stage("分配"):
+            data = bytearray(64 * 1024 * 1024)
+            data[::4096] = b'x' * len(data[::4096])
+        with profiler.stage("空闲"):
+            pass
+
+    record = profiler.last_record
+    assert [stage['stage'] for stage in record['stages']] == ["分配", "空闲"]
+    assert len(reports) == 1
+    if 'rss_delta_mb' in record['stages'][0]:
+        assert record['stages'][0]['rss_delta_mb'] > 32
+        assert "本次操作: 常驻内存变化" in reports[0]
+    if 'lifetime_rss_peak_mb' in record:
+        assert "进程生命周期内存峰值" in reports[0]
+    del data
+
+
+def test_capture_records_allocation_peak_per_operation():
+    profiler = StageProfiler("测试")
+    profiler.capture = True
+    with profiler.operation("操作"):
+        with profiler.stage("分配"):
+            data = [0] * 1000000
+            del data
+        with profiler.stage("小阶段"):
+            pass
+
+    record = profiler.last_record
+    assert record['stages'][0]['mem_peak_mb'] > 5
+    assert record['stages'][1]['mem_peak_mb'] < 1
+    # 操作级峰值不会被后续阶段的 reset_peak 抹掉
+    assert record['mem_peak_mb'] >= record['stages'][0]['mem_peak_mb']
+    assert "cProfile" in profiler.history[0]
+
+
+def test_nested_operation_becomes_stage_and_history_keeps_reports():
+    profiler = StageProfiler("测试", history=2)
+    with profiler.operation("加载数据"):
+        with profiler.operation("表格刷新"):
+            pass
+    assert profiler.last_record['stages'][0]['stage'] == "表格刷新"
+
+    # 嵌套操作中的阶段记录在其之后并缩进，不与外层阶段并列
+    with profiler.operation("删除列"):
+        with profiler.operation("表格刷新"):
+            with profiler.stage("单元格填充"):
+                pass
+        with profiler.stage("统计"):
+            pass
+    stages = profiler.last_record['stages']
+    assert [(stage['stage'], stage['depth']) for stage in stages] == [("表格刷新", 0), ("单元格填充", 1), ("统计", 0)]
+    assert stages[0]['seconds'] >= stages[1]['seconds']
+    lines = profiler.history[0].splitlines()
+    assert lines[1].startswith("  表格刷新")
+    assert lines[2].startswith("    └ 单元格填充")
+    assert lines[3].startswith("  统计")
+
+    with profiler.operation("表格刷新"):
+        pass
+    with pytest.raises(KeyError):
+        with profiler.operation("失败"):
+            raise KeyError
+    assert len(profiler.history) == 2
+    assert "失败" in profiler.history[0] and "[失败]" in profiler.history[0]
+    assert "表格刷新" in profiler.history[1]